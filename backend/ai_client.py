@@ -1,72 +1,99 @@
 import os
 import google.generativeai as genai
 from groq import Groq
+from response_cache import ResponseCache, make_cache_key
+from provider_router import ProviderRouter
+from metrics import metrics
 from utils import get_logger, config
 
 logger = get_logger(__name__)
 
+generate_seconds = metrics.histogram("ai_generate_response_seconds", "DM reply generation time including cache lookup and fallbacks")
+
+FALLBACK_RESPONSE = "I'm currently away but I've received your message. I'll get back to you shortly!"
+
 class AIClient:
+    gemini_model_name = 'gemini-1.5-flash'
+    groq_model_name = "llama3-8b-8192"
+
     def __init__(self):
         self.gemini_key = config.get("GOOGLE_AI_API_KEY")
         self.groq_key = config.get("GROQ_API_KEY")
         
+        self.router = ProviderRouter(
+            timeout=config["AI_TIMEOUT"],
+            hedge=config["AI_HEDGE"],
+            hedge_min_delay=config["AI_HEDGE_MIN_DELAY"],
+            failure_threshold=config["AI_BREAKER_THRESHOLD"],
+            cooldown=config["AI_BREAKER_COOLDOWN"],
+        )
+        
+        # Registration order is the priority used until latency stats exist
         if self.gemini_key:
             genai.configure(api_key=self.gemini_key)
-            self.gemini_model = genai.GenerativeModel('gemini-1.5-flash')
+            self.gemini_model = genai.GenerativeModel(self.gemini_model_name)
+            self.router.add("gemini", self._call_gemini)
         
         if self.groq_key:
             self.groq_client = Groq(api_key=self.groq_key)
+            self.router.add("groq", self._call_groq)
 
-    def generate_response(self, prompt, context=""):
+        self.cache = ResponseCache(
+            max_entries=config["AI_CACHE_MAX_ENTRIES"],
+            ttl=config["AI_CACHE_TTL"],
+            persist=config["AI_CACHE_PERSIST"],
+        )
+
+    @generate_seconds.timed()
+    def generate_response(self, prompt, context="", use_cache=True):
         full_prompt = f"Context:\n{context}\n\nUser Question:\n{prompt}\n\nPlease provide a helpful, professional, and concise response based on the context. START YOUR RESPONSE BY STATING YOU ARE AN AI RECRUITING ASSISTANT."
         
-        # Try Gemini first
-        if self.gemini_key:
-            try:
-                response = self.gemini_model.generate_content(full_prompt)
-                return response.text
-            except Exception as e:
-                logger.error(f"Gemini API failed: {e}")
-        
-        # Fallback to Groq
-        if self.groq_key:
-            try:
-                chat_completion = self.groq_client.chat.completions.create(
-                    messages=[
-                        {
-                            "role": "user",
-                            "content": full_prompt,
-                        }
-                    ],
-                    model="llama3-8b-8192",
-                )
-                return chat_completion.choices[0].message.content
-            except Exception as e:
-                logger.error(f"Groq API failed: {e}")
+        response = self.complete(full_prompt, use_cache=use_cache)
+        if response is not None:
+            return response
         
         # Final fallback
-        return "I'm currently away but I've received your message. I'll get back to you shortly!"
+        return FALLBACK_RESPONSE
 
-    def score_lead(self, title, body):
-        prompt = f"""
-        Analyze this Reddit post for a sales/commission job opportunity.
-        Title: {title}
-        Body: {body}
-        
-        Return a JSON object with:
-        - score (0-100)
-        - reasoning (string)
-        - intent (string: 'seeking_work', 'hiring', 'discussion', 'spam')
+    def complete(self, prompt, use_cache=True, cache_if=None):
         """
-        # Simplified for now, just returning a mock score if no AI
-        try:
-            response = self.generate_response(prompt)
-            # In a real impl, parse JSON. For now assume text.
-            # This is a placeholder for the complex extraction logic
-            if "score" in response.lower():
-                return response
-            return "Score: 50. Analysis: Needs manual review."
-        except:
-            return "Score: 0. Error in AI analysis."
+        Sends prompt as-is to the providers. Returns None if every provider
+        failed. With `cache_if`, a fresh response is only cached when
+        cache_if(response) is true, so callers can keep unusable answers out.
+        """
+        cache_key = None
+        if use_cache and self.cache.max_entries > 0:
+            models = f"{self.gemini_model_name}|{self.groq_model_name}"
+            cache_key = make_cache_key(prompt, "", models)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        # Healthiest/fastest provider first, falling back (or hedging) to the other
+        provider, response = self.router.call(prompt)
+        if provider is None:
+            return None
+        if cache_key and (cache_if is None or cache_if(response)):
+            self.cache.set(cache_key, response, model=provider)
+        return response
+
+    def _call_gemini(self, full_prompt):
+        response = self.gemini_model.generate_content(full_prompt)
+        return response.text
+
+    def _call_groq(self, full_prompt):
+        chat_completion = self.groq_client.chat.completions.create(
+            messages=[
+                {
+                    "role": "user",
+                    "content": full_prompt,
+                }
+            ],
+            model=self.groq_model_name,
+        )
+        return chat_completion.choices[0].message.content
+
+    def provider_stats(self):
+        return self.router.stats()
 
 ai_client = AIClient()
@@ -1,74 +1,415 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from database import get_db, Lead, Conversation, SystemLog, Settings
+import json
+import asyncio
+import hashlib
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sqlalchemy.orm import Session, defer, load_only
+from sqlalchemy.dialects.sqlite import insert
+from typing import List, Optional
+from datetime import datetime, timedelta
+from collections import Counter
+from database import get_db, next_version, parse_timestamp, LEAD_INTERNAL_COLUMNS, Lead, Conversation, SystemLog, LogRollup, Settings
+from message_store import append_messages, get_messages, get_or_create_conversation, serialize_message
+from rag import rag_system
+from ai_client import ai_client
+from workers import worker_manager
+from db_writer import db_writer
+from log_sink import log_sink
+from metrics import metrics
+from near_duplicates import duplicate_index, fingerprint, count_duplicates
+from notifier import notifier
+from reddit_client import reddit_clients
+from monitor import stream_monitor, seen_posts
+from lead_scoring import score_unscored_leads
+from search import search_leads, search_messages, rebuild_search_indexes
+from events import event_bus, format_sse
+from pagination import keyset_page, change_page, sync_cursor, check_etag, SYNC_CURSOR_HEADER
 
 router = APIRouter()
 
+# Keep IN (...) lists well under SQLite's bound-parameter limit
+COLLECTOR_CHUNK_SIZE = 500
+
+EVENT_HEARTBEAT_SECONDS = 15
+
+# Scalar columns served by list views; the messages history only comes from /conversations/{username}
+CONVERSATION_SUMMARY_COLUMNS = (
+    Conversation.id,
+    Conversation.reddit_username,
+    Conversation.status,
+    Conversation.last_message_at,
+    Conversation.human_takeover,
+    Conversation.last_message_preview,
+    Conversation.message_count,
+    Conversation.version,
+)
+
+def conversation_summaries(db):
+    return db.query(Conversation).options(load_only(*CONVERSATION_SUMMARY_COLUMNS))
+
+def lead_rows(db):
+    # Deferred columns are never loaded, so they are left out of the serialized rows
+    return db.query(Lead).options(*(defer(getattr(Lead, name)) for name in LEAD_INTERNAL_COLUMNS))
+
+def _lead_values(data):
+    return {
+        "reddit_id": data['id'],
+        "title": data['title'],
+        "body": data['body'],
+        "subreddit": data['subreddit'],
+        "author": data['author'],
+        "url": data['url'],
+        "score": data.get('score', 0),
+        "fingerprint": fingerprint(data['title'], data['body']),
+    }
+
 @router.get("/leads")
-def read_leads(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    leads = db.query(Lead).order_by(Lead.created_at.desc()).offset(skip).limit(limit).all()
-    return leads
+def read_leads(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    subreddit: Optional[str] = None,
+    min_score: Optional[float] = None,
+    max_score: Optional[float] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    include_duplicates: bool = False,
+    db: Session = Depends(get_db),
+):
+    cursor_now = sync_cursor(db, Lead.version, Lead.id)
+    not_modified = check_etag(request, response, cursor_now)
+    if not_modified:
+        return not_modified
+    response.headers[SYNC_CURSOR_HEADER] = cursor_now
+
+    query = lead_rows(db)
+    if not include_duplicates:
+        # Near-duplicates are counted on their canonical lead (duplicate_count) instead
+        query = query.filter(Lead.duplicate_of.is_(None))
+    if status:
+        query = query.filter(Lead.status == status)
+    if subreddit:
+        query = query.filter(Lead.subreddit == subreddit)
+    if min_score is not None:
+        query = query.filter(Lead.score >= min_score)
+    if max_score is not None:
+        query = query.filter(Lead.score <= max_score)
+    if since:
+        query = query.filter(Lead.created_at >= since)
+    if until:
+        query = query.filter(Lead.created_at < until)
+    # skip is legacy offset paging; prefer the X-Next-Cursor header
+    return keyset_page(query, Lead.created_at, Lead.id, cursor, limit, response, skip=skip)
+
+@router.get("/leads/{reddit_id}/duplicates")
+def read_lead_duplicates(reddit_id: str, db: Session = Depends(get_db)):
+    """The near-duplicates (e.g. cross-posts) grouped under a canonical lead, oldest first."""
+    return lead_rows(db).filter(Lead.duplicate_of == reddit_id).order_by(Lead.id.asc()).all()
+
+@router.post("/leads/score")
+def score_leads(limit: int = 100, db: Session = Depends(get_db)):
+    scored = score_unscored_leads(db, limit=limit)
+    return {"status": "success", "scored": scored}
 
 @router.get("/conversations")
-def read_conversations(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    conversations = db.query(Conversation).order_by(Conversation.last_message_at.desc()).offset(skip).limit(limit).all()
-    return conversations
+def read_conversations(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    human_takeover: Optional[bool] = None,
+    db: Session = Depends(get_db),
+):
+    cursor_now = sync_cursor(db, Conversation.version, Conversation.id)
+    not_modified = check_etag(request, response, cursor_now)
+    if not_modified:
+        return not_modified
+    response.headers[SYNC_CURSOR_HEADER] = cursor_now
+
+    query = conversation_summaries(db)
+    if status:
+        query = query.filter(Conversation.status == status)
+    if human_takeover is not None:
+        query = query.filter(Conversation.human_takeover == human_takeover)
+    return keyset_page(query, Conversation.last_message_at, Conversation.id, cursor, limit, response, skip=skip)
 
 @router.get("/conversations/{reddit_username}")
-def read_conversation(reddit_username: str, db: Session = Depends(get_db)):
-    conversation = db.query(Conversation).filter(Conversation.reddit_username == reddit_username).first()
+def read_conversation(reddit_username: str, limit: int = 50, before: Optional[int] = None, db: Session = Depends(get_db)):
+    conversation = conversation_summaries(db).filter(Conversation.reddit_username == reddit_username).first()
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
-    return conversation
 
-@router.post("/conversations/{reddit_username}/takeover")
-def toggle_takeover(reddit_username: str, enable: bool, db: Session = Depends(get_db)):
-    conversation = db.query(Conversation).filter(Conversation.reddit_username == reddit_username).first()
+    # Newest `limit` messages, or the `limit` before message id `before` for older pages
+    messages = get_messages(db, conversation.id, limit=limit, before=before)
+    result = {column.key: getattr(conversation, column.key) for column in CONVERSATION_SUMMARY_COLUMNS}
+    result["notes"] = conversation.notes
+    result["messages"] = [serialize_message(message) for message in messages]
+    result["total_messages"] = conversation.message_count
+    result["next_before"] = messages[0].id if len(messages) == limit else None
+    return result
+
+@router.get("/conversations/{reddit_username}/messages")
+def read_conversation_messages(reddit_username: str, limit: int = 50, before: Optional[int] = None, db: Session = Depends(get_db)):
+    conversation = conversation_summaries(db).filter(Conversation.reddit_username == reddit_username).first()
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
-    
-    conversation.human_takeover = enable
-    db.commit()
+    messages = get_messages(db, conversation.id, limit=limit, before=before)
+    return {
+        "messages": [serialize_message(message) for message in messages],
+        "next_before": messages[0].id if len(messages) == limit else None,
+    }
+
+@router.post("/conversations/{reddit_username}/takeover")
+def toggle_takeover(reddit_username: str, enable: bool):
+    def write(db):
+        conversation = db.query(Conversation).filter(Conversation.reddit_username == reddit_username).first()
+        if not conversation:
+            return False
+        conversation.human_takeover = enable
+        return True
+
+    if not db_writer.run(write):
+        raise HTTPException(status_code=404, detail="Conversation not found")
     return {"status": "success", "human_takeover": enable}
 
+@router.get("/search")
+def search(
+    q: str,
+    type: str = "all",
+    subreddit: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0,
+    db: Session = Depends(get_db),
+):
+    """Ranked full-text search over lead titles/bodies and conversation messages; type is leads, conversations or all."""
+    if type not in ("leads", "conversations", "all"):
+        raise HTTPException(status_code=400, detail="type must be leads, conversations or all")
+    result = {"query": q, "offset": offset}
+    if type in ("leads", "all"):
+        result["leads"] = search_leads(db, q, subreddit=subreddit, status=status, limit=limit, offset=offset)
+    if type in ("conversations", "all"):
+        result["messages"] = search_messages(db, q, status=status, limit=limit, offset=offset)
+    return result
+
+@router.post("/search/rebuild")
+def rebuild_search():
+    rebuild_search_indexes()
+    return {"status": "success"}
+
 @router.get("/logs")
-def read_logs(limit: int = 50, db: Session = Depends(get_db)):
-    logs = db.query(SystemLog).order_by(SystemLog.timestamp.desc()).limit(limit).all()
-    return logs
+def read_logs(
+    request: Request,
+    response: Response,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    level: Optional[str] = None,
+    module: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    cursor_now = sync_cursor(db, SystemLog.id, SystemLog.id)
+    not_modified = check_etag(request, response, cursor_now)
+    if not_modified:
+        return not_modified
+    response.headers[SYNC_CURSOR_HEADER] = cursor_now
+
+    query = db.query(SystemLog)
+    if level:
+        query = query.filter(SystemLog.level == level.upper())
+    if module:
+        query = query.filter(SystemLog.module == module)
+    return keyset_page(query, SystemLog.timestamp, SystemLog.id, cursor, limit, response)
+
+@router.get("/logs/rollups")
+def read_log_rollups(minutes: int = 60, module: Optional[str] = None, level: Optional[str] = None, db: Session = Depends(get_db)):
+    """Per-minute record counts by module and level for the last `minutes` minutes."""
+    query = db.query(LogRollup).filter(LogRollup.minute >= datetime.utcnow() - timedelta(minutes=minutes))
+    if module:
+        query = query.filter(LogRollup.module == module)
+    if level:
+        query = query.filter(LogRollup.level == level.upper())
+    return query.order_by(LogRollup.minute.asc()).all()
+
+@router.get("/logs/sink")
+def read_log_sink():
+    return log_sink.stats()
+
+# Change feeds: pass the returned cursor back as `since` to get only rows written in between
+@router.get("/changes/leads")
+def read_lead_changes(request: Request, response: Response, since: Optional[str] = None, limit: int = 100, db: Session = Depends(get_db)):
+    not_modified = check_etag(request, response, sync_cursor(db, Lead.version, Lead.id))
+    if not_modified:
+        return not_modified
+    return change_page(lead_rows(db), Lead.version, Lead.id, since, limit)
+
+@router.get("/changes/conversations")
+def read_conversation_changes(request: Request, response: Response, since: Optional[str] = None, limit: int = 100, db: Session = Depends(get_db)):
+    not_modified = check_etag(request, response, sync_cursor(db, Conversation.version, Conversation.id))
+    if not_modified:
+        return not_modified
+    return change_page(conversation_summaries(db), Conversation.version, Conversation.id, since, limit)
+
+@router.get("/changes/logs")
+def read_log_changes(request: Request, response: Response, since: Optional[str] = None, limit: int = 100, db: Session = Depends(get_db)):
+    not_modified = check_etag(request, response, sync_cursor(db, SystemLog.id, SystemLog.id))
+    if not_modified:
+        return not_modified
+    # Logs are append-only, so the id doubles as the version
+    return change_page(db.query(SystemLog), SystemLog.id, SystemLog.id, since, limit)
+
+@router.get("/events")
+async def stream_events(request: Request, last_event_id: Optional[int] = None):
+    # EventSource sends Last-Event-ID itself when it reconnects
+    header_id = request.headers.get("last-event-id")
+    if header_id and header_id.isdigit():
+        last_event_id = int(header_id)
+    subscriber, backlog = event_bus.subscribe(last_event_id)
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            for event in backlog:
+                yield format_sse(event)
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), timeout=EVENT_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    # Dropped as a slow consumer; the client reconnects and resumes from its last id
+                    break
+                yield format_sse(event)
+        finally:
+            event_bus.unsubscribe(subscriber)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.get("/events/stats")
+def read_event_stats():
+    return event_bus.stats()
 
 @router.post("/collector/lead")
-def collect_lead(data: dict, db: Session = Depends(get_db)):
-    # Try to find existing lead
-    existing = db.query(Lead).filter(Lead.reddit_id == data['id']).first()
-    if existing:
-        return {"status": "skipped", "id": data['id']}
-    
-    lead = Lead(
-        reddit_id=data['id'],
-        title=data['title'],
-        body=data['body'],
-        subreddit=data['subreddit'],
-        author=data['author'],
-        url=data['url'],
-        score=data.get('score', 0)
-    )
-    db.add(lead)
-    db.commit()
-    return {"status": "success", "id": data['id']}
+def collect_lead(data: dict):
+    values = _lead_values(data)
+    # Checked and indexed in one step, so a concurrent copy of the same ad is grouped under this one
+    canonicals, claimed = duplicate_index.claim([(data['id'], values["fingerprint"])])
+    canonical = canonicals.get(data['id'])
+
+    def write(db):
+        # Try to find existing lead
+        if db.query(Lead.id).filter(Lead.reddit_id == data['id']).first():
+            return "skipped"
+        db.add(Lead(**values, duplicate_of=canonical))
+        if canonical:
+            count_duplicates(db, {canonical: 1})
+        return "success"
+
+    try:
+        status = db_writer.run(write)
+    except Exception:
+        duplicate_index.release(claimed)
+        raise
+    if status != "success":
+        duplicate_index.release(claimed)
+        canonical = None
+    return {"status": status, "id": data['id'], "duplicate_of": canonical}
+
+@router.post("/collector/leads")
+def collect_leads(data: List[dict]):
+    # Dedup within the batch first, keeping the first occurrence of each id
+    batch = {}
+    for item in data:
+        batch.setdefault(item['id'], item)
+    ids = list(batch)
+    values = {reddit_id: _lead_values(item) for reddit_id, item in batch.items()}
+    # Cross-posts within the batch or of recent leads are stored as duplicates of the first copy
+    canonicals, claimed = duplicate_index.claim([(reddit_id, values[reddit_id]["fingerprint"]) for reddit_id in ids])
+
+    def write(db):
+        existing = set()
+        for i in range(0, len(ids), COLLECTOR_CHUNK_SIZE):
+            chunk = ids[i:i + COLLECTOR_CHUNK_SIZE]
+            existing.update(row[0] for row in db.query(Lead.reddit_id).filter(Lead.reddit_id.in_(chunk)))
+
+        new_rows = [dict(values[reddit_id], duplicate_of=canonicals.get(reddit_id)) for reddit_id in ids if reddit_id not in existing]
+        inserted = set()
+        if new_rows:
+            # Core inserts skip the ORM before_flush hook, so stamp the change version here
+            version = next_version(db.connection())
+            for row in new_rows:
+                row["version"] = version
+        for i in range(0, len(new_rows), COLLECTOR_CHUNK_SIZE):
+            stmt = insert(Lead).values(new_rows[i:i + COLLECTOR_CHUNK_SIZE])
+            # Ids inserted through another path since the lookup above are skipped
+            stmt = stmt.on_conflict_do_nothing(index_elements=["reddit_id"]).returning(Lead.reddit_id)
+            inserted.update(row[0] for row in db.execute(stmt))
+        count_duplicates(db, Counter(canonicals[reddit_id] for reddit_id in inserted if reddit_id in canonicals))
+        return new_rows, inserted
+
+    try:
+        new_rows, inserted = db_writer.run(write)
+    except Exception:
+        duplicate_index.release(claimed)
+        raise
+    duplicate_index.release(claimed - inserted)
+
+    # Core inserts bypass the session event hooks, so announce the new leads here
+    for row in new_rows:
+        if row["reddit_id"] in inserted:
+            event_bus.publish("lead", {key: value for key, value in row.items() if key not in LEAD_INTERNAL_COLUMNS})
+
+    results = [
+        {"id": reddit_id, "status": "success" if reddit_id in inserted else "skipped", "duplicate_of": canonicals.get(reddit_id) if reddit_id in inserted else None}
+        for reddit_id in ids
+    ]
+    return {
+        "status": "success",
+        "inserted": len(inserted),
+        "skipped": len(ids) - len(inserted),
+        "duplicates": sum(1 for reddit_id in inserted if reddit_id in canonicals),
+        "results": results,
+    }
+
+def _devvit_message_id(username, position, item):
+    """
+    Dedup key for a Devvit history item, which has no id of its own. The
+    bot's history is append-only, so the position is stable across resends;
+    with the content hash it keeps messages sharing a role and timestamp
+    apart. Items without a timestamp get no key and are always appended.
+    """
+    if not item.get("timestamp"):
+        return None
+    digest = hashlib.sha1((item.get("content") or "").encode("utf-8")).hexdigest()[:16]
+    return f"devvit:{username}:{position}:{item.get('role')}:{item['timestamp']}:{digest}"
 
 @router.post("/collector/conversation")
-def collect_conversation(data: dict, db: Session = Depends(get_db)):
-    # Find or create conversation
-    convo = db.query(Conversation).filter(Conversation.reddit_username == data['username']).first()
-    if not convo:
-        convo = Conversation(reddit_username=data['username'])
-        db.add(convo)
-    
-    convo.last_message = data['last_message']
-    convo.history = data['history'] # Expected to be stringified JSON
-    convo.last_message_at = data['timestamp']
-    db.commit()
+def collect_conversation(data: dict):
+    # The Devvit bot sends its whole history every time; only messages not stored yet are appended
+    history = data['history'] # Expected to be stringified JSON
+    history = json.loads(history) if isinstance(history, str) else history
+    items = [
+        {
+            "role": item.get("role"),
+            "content": item.get("content"),
+            "timestamp": item.get("timestamp"),
+            "external_id": item.get("id") or _devvit_message_id(data['username'], position, item),
+        }
+        for position, item in enumerate(history)
+    ]
+
+    def write(db):
+        # Find or create conversation
+        convo = get_or_create_conversation(db, data['username'])
+        append_messages(db, convo, items)
+        convo.last_message_at = parse_timestamp(data['timestamp']) or datetime.utcnow()
+
+    db_writer.run(write)
     return {"status": "success"}
 
 @router.get("/settings/{key}")
@@ -77,13 +418,65 @@ def get_setting(key: str, db: Session = Depends(get_db)):
     return setting.value if setting else None
 
 @router.post("/settings/{key}")
-def update_setting(key: str, value: dict, db: Session = Depends(get_db)):
-    setting = db.query(Settings).filter(Settings.key == key).first()
-    if not setting:
-        setting = Settings(key=key, value=value)
-        db.add(setting)
-    else:
-        setting.value = value
-    db.commit()
+def update_setting(key: str, value: dict):
+    def write(db):
+        setting = db.query(Settings).filter(Settings.key == key).first()
+        if not setting:
+            db.add(Settings(key=key, value=value))
+        else:
+            setting.value = value
+
+    db_writer.run(write)
     return {"status": "success"}
 
+
+@router.post("/rag/reload")
+def reload_knowledge():
+    changed = rag_system.reload()
+    return {"status": "success", "changed": changed, "chunks": len(rag_system.chunks)}
+
+@router.get("/workers")
+def read_workers():
+    return worker_manager.status()
+
+@router.get("/monitor/streams")
+def read_monitor_streams():
+    return stream_monitor.status()
+
+@router.get("/monitor/seen")
+def read_seen_posts():
+    return seen_posts.stats()
+
+@router.get("/monitor/duplicates")
+def read_duplicate_index():
+    return duplicate_index.stats()
+
+@router.get("/notifications")
+def read_notifications():
+    return notifier.stats()
+
+@router.get("/reddit/client")
+def read_reddit_client():
+    return reddit_clients.stats()
+
+@router.get("/db/writer")
+def read_db_writer():
+    return db_writer.stats()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def read_metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@router.get("/metrics/summary")
+def read_metrics_summary():
+    """Per-stage latency percentiles (estimated from the histogram buckets) and counters, for the dashboard."""
+    return metrics.summary()
+
+@router.get("/ai/cache")
+def read_ai_cache_stats():
+    return ai_client.cache.stats()
+
+@router.get("/ai/providers")
+def read_ai_providers():
+    return ai_client.provider_stats()
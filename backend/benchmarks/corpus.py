@@ -0,0 +1,45 @@
+import os
+import random
+
+# Domain words appear in most documents; the synthetic vocabulary gives a
+# long tail of rarer terms, so postings lists have realistic skew.
+DOMAIN_WORDS = (
+    "commission payout remote role sales closer lead client call schedule onboarding training "
+    "hours weekly bonus product pitch script crm follow appointment setter contract payment"
+).split()
+
+def make_vocabulary(size, seed=1):
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(4, 10))))
+    return DOMAIN_WORDS + sorted(words)
+
+def _zipf_weights(count):
+    return [1.0 / (rank + 1) for rank in range(count)]
+
+def write_corpus(directory, documents=50, paragraphs=20, words_per_paragraph=60, vocabulary_size=5000, seed=1):
+    """
+    Writes `documents` knowledge files of `paragraphs` paragraphs each into
+    `directory` (the layout LighterRAG reads: *.txt, paragraphs separated by
+    a blank line). Returns the vocabulary, for building queries.
+    """
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(vocabulary_size, seed)
+    weights = _zipf_weights(len(vocabulary))
+    os.makedirs(directory, exist_ok=True)
+    for doc in range(documents):
+        sections = [
+            " ".join(rng.choices(vocabulary, weights=weights, k=words_per_paragraph)).capitalize() + "."
+            for _ in range(paragraphs)
+        ]
+        with open(os.path.join(directory, f"knowledge_{doc:04d}.txt"), "w", encoding="utf-8") as f:
+            f.write("\n\n".join(sections))
+    return vocabulary
+
+def make_queries(vocabulary, count, words=(3, 12), seed=2):
+    """DM-like queries mixing common and rare vocabulary terms."""
+    rng = random.Random(seed)
+    weights = _zipf_weights(len(vocabulary))
+    return [" ".join(rng.choices(vocabulary, weights=weights, k=rng.randint(*words))) for _ in range(count)]
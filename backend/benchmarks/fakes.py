@@ -0,0 +1,198 @@
+import json
+import time
+import random
+import hashlib
+import threading
+import praw
+
+# Words the generated posts and messages are built from. A share of posts
+# also gets one of the monitor's keyword phrases so they become leads.
+FILLER_WORDS = (
+    "looking for advice on my first job after college and whether remote roles are worth it "
+    "anyone here tried moving from retail into tech support or customer success my manager says "
+    "the market is slow this quarter but i have a portfolio ready and references from previous "
+    "employers what tools do you use for tracking pipelines calendars and follow ups every week"
+).split()
+
+LEAD_PHRASES = (
+    "commission only sales role",
+    "remote work opportunity",
+    "freelance closer wanted",
+    "side hustle that pays weekly",
+    "work from home appointment setter",
+    "earn money closing deals",
+)
+
+QUESTIONS = (
+    "How does the commission structure work?",
+    "Is this role fully remote?",
+    "What hours would I be expected to work?",
+    "Do I need prior sales experience?",
+    "How do payouts work and how often are they sent?",
+    "What does the onboarding process look like?",
+)
+
+class Author:
+    """Stands in for praw's Redditor: only str() is used."""
+    def __init__(self, name):
+        self.name = name
+
+    def __str__(self):
+        return self.name
+
+class FakeSubredditRef:
+    def __init__(self, display_name):
+        self.display_name = display_name
+
+class FakeSubmission:
+    """The Submission attributes the monitor reads."""
+    def __init__(self, subreddit, post_id, created_utc, title, selftext, author):
+        self.id = post_id
+        self.fullname = f"t3_{post_id}"
+        self.created_utc = created_utc
+        self.title = title
+        self.selftext = selftext
+        self.subreddit = FakeSubredditRef(subreddit)
+        self.url = f"https://reddit.com/r/{subreddit}/comments/{post_id}"
+        self.author = Author(author)
+
+class FakeListing:
+    def __init__(self, reddit, name):
+        self.reddit = reddit
+        self.name = name
+
+    def new(self, limit=100):
+        names = self.name.split("+")
+        posts = [post for name in names for post in self.reddit.posts.get(name, [])]
+        if len(names) > 1:
+            posts.sort(key=lambda post: post.created_utc, reverse=True)
+        self.reddit.calls += 1
+        return iter(posts[:limit])
+
+class FakeMessage(praw.models.Message):
+    """
+    A praw Message (the DM handler checks isinstance) that never talks to
+    Reddit: reply() only sleeps for `reply_latency` seconds and
+    mark_read() drops it from the fake inbox.
+    """
+    def __init__(self, author, body, message_id, reply_latency=0.0, inbox=None):
+        # Bypasses praw's constructor, which needs a live Reddit instance
+        self.__dict__.update(_fake_author=author, body=body, id=message_id, _fetched=True, _reply_latency=reply_latency, _inbox=inbox)
+
+    author = property(lambda self: Author(self._fake_author))
+    fullname = property(lambda self: f"t4_{self.id}")
+
+    def reply(self, body):
+        if self._reply_latency:
+            time.sleep(self._reply_latency)
+
+    def mark_read(self):
+        if self._inbox is not None:
+            self._inbox.mark_read([self])
+
+    def __repr__(self):
+        return f"FakeMessage({self.id})"
+
+class FakeInbox:
+    def __init__(self):
+        self.pending = []
+        self.marked = 0
+        self._lock = threading.Lock()  # DM worker threads mark messages read concurrently
+
+    def unread(self, limit=None):
+        with self._lock:
+            items = self.pending[:limit] if limit else list(self.pending)
+        return iter(items)
+
+    def mark_read(self, items):
+        ids = {id(item) for item in items}
+        with self._lock:
+            self.pending = [item for item in self.pending if id(item) not in ids]
+            self.marked += len(ids)
+
+class FakeReddit:
+    """
+    In-memory stand-in for praw.Reddit covering subreddit(...).new() and
+    the inbox. publish() and deliver() generate new posts and DMs from a
+    seeded random source, so runs are reproducible.
+    """
+    def __init__(self, subreddits, lead_ratio=0.3, reply_latency=0.0, seed=1):
+        self.subreddits = list(subreddits)
+        self.lead_ratio = lead_ratio
+        self.reply_latency = reply_latency
+        self.posts = {name: [] for name in self.subreddits}  # newest first
+        self.inbox = FakeInbox()
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._next_id = 0
+        self._clock = time.time()
+
+    def subreddit(self, name):
+        return FakeListing(self, name)
+
+    def _sentence(self, words):
+        return " ".join(self._random.choice(FILLER_WORDS) for _ in range(words))
+
+    def _new_id(self):
+        self._next_id += 1
+        return f"b{self._next_id:07d}"
+
+    def publish(self, per_subreddit):
+        """Adds `per_subreddit` new posts to every subreddit."""
+        for name in self.subreddits:
+            for _ in range(per_subreddit):
+                self._clock += 1
+                title = self._sentence(8)
+                body = self._sentence(60)
+                if self._random.random() < self.lead_ratio:
+                    title = f"{self._random.choice(LEAD_PHRASES)} {title}"
+                post = FakeSubmission(name, self._new_id(), self._clock, title, body, f"user{self._random.randrange(5000)}")
+                self.posts[name].insert(0, post)
+
+    def deliver(self, count, senders=50):
+        """Puts `count` new DMs from up to `senders` distinct users in the inbox."""
+        for _ in range(count):
+            body = f"{self._random.choice(QUESTIONS)} {self._sentence(20)}"
+            author = f"sender{self._random.randrange(senders)}"
+            self.inbox.pending.append(FakeMessage(author, body, self._new_id(), self.reply_latency, self.inbox))
+
+class FakeLLM:
+    """
+    An LLM provider callable for ProviderRouter with configurable latency
+    (mean ± uniform jitter, in seconds) and error rate. Lead scoring prompts
+    get a valid JSON array for the posts in them; anything else gets a
+    canned reply.
+    """
+    def __init__(self, name, latency=0.05, jitter=0.0, error_rate=0.0, seed=1):
+        self.name = name
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.calls = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt):
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            fail = self._random.random() < self.error_rate
+        time.sleep(delay)
+        if fail:
+            with self._lock:
+                self.errors += 1
+            raise RuntimeError(f"{self.name}: simulated provider error")
+        if "\nPosts:\n" in prompt:
+            return self._score(prompt)
+        return "I'm an AI recruiting assistant. Thanks for reaching out! The role is fully remote and commission based."
+
+    @staticmethod
+    def _score(prompt):
+        posts = json.loads(prompt.split("\nPosts:\n", 1)[1])
+        items = []
+        for post in posts:
+            # Deterministic per post, so cached and fresh runs agree
+            score = int(hashlib.md5(str(post["id"]).encode("utf-8")).hexdigest(), 16) % 101
+            items.append({"id": post["id"], "score": score, "intent": "seeking_work", "reasoning": "Synthetic score."})
+        return json.dumps(items)
@@ -0,0 +1,111 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+class StageResult:
+    def __init__(self, name, concurrency=1):
+        self.name = name
+        self.concurrency = concurrency
+        self.latencies = []
+        self.errors = 0
+        self.wall = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, latency, ok=True):
+        with self._lock:
+            self.latencies.append(latency)
+            if not ok:
+                self.errors += 1
+
+    def summary(self):
+        ordered = sorted(self.latencies)
+        count = len(ordered)
+
+        def ms(value):
+            return round(value * 1000, 3) if value is not None else None
+
+        return {
+            "count": count,
+            "errors": self.errors,
+            "concurrency": self.concurrency,
+            "wall_seconds": round(self.wall, 3),
+            "throughput_per_second": round(count / self.wall, 2) if self.wall > 0 else None,
+            "mean_ms": ms(sum(ordered) / count) if count else None,
+            "p50_ms": ms(percentile(ordered, 50)),
+            "p95_ms": ms(percentile(ordered, 95)),
+            "p99_ms": ms(percentile(ordered, 99)),
+            "max_ms": ms(ordered[-1]) if count else None,
+        }
+
+class Recorder:
+    """
+    Times a callable per iteration and collects per-stage latencies.
+    Throughput is iterations over the stage's wall-clock time, so it
+    reflects concurrency rather than the sum of latencies.
+    """
+    def __init__(self):
+        self.stages = {}
+
+    def run(self, name, func, iterations, concurrency=1, setup=None):
+        """
+        Calls func(i) for i in range(iterations) on `concurrency` threads.
+        setup(i), if given, runs untimed just before each call. A call counts
+        as an error if it raises or returns False.
+        """
+        result = StageResult(name, concurrency)
+        self.stages[name] = result
+
+        def one(i):
+            if setup is not None:
+                setup(i)
+            started = time.perf_counter()
+            try:
+                ok = func(i) is not False
+            except Exception:
+                ok = False
+            result.record(time.perf_counter() - started, ok)
+
+        started = time.perf_counter()
+        if concurrency <= 1:
+            for i in range(iterations):
+                one(i)
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"bench-{name}") as executor:
+                list(executor.map(one, range(iterations)))
+        result.wall = time.perf_counter() - started
+        return result
+
+    def summary(self):
+        return {name: stage.summary() for name, stage in self.stages.items()}
+
+# Figures compared against a baseline: (key, True if higher is better)
+COMPARED = (("p50_ms", False), ("p95_ms", False), ("p99_ms", False), ("throughput_per_second", True))
+
+def compare(current, baseline, max_regression=0.2):
+    """
+    Compares two result files' stages. Returns (rows, regressions): rows are
+    (stage, figure, baseline, current, relative change) and regressions the
+    rows that got worse by more than `max_regression` (0.2 = 20%).
+    """
+    rows, regressions = [], []
+    for stage, figures in current["stages"].items():
+        before = baseline.get("stages", {}).get(stage)
+        if not before:
+            continue
+        for key, higher_is_better in COMPARED:
+            old, new = before.get(key), figures.get(key)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            row = (stage, key, old, new, change)
+            rows.append(row)
+            worse = -change if higher_is_better else change
+            if worse > max_regression:
+                regressions.append(row)
+    return rows, regressions
@@ -0,0 +1,276 @@
+"""
+Offline benchmarks for the lead, DM, RAG, LLM and collector paths.
+
+Nothing touches the network: Reddit is replaced by an in-memory fake
+(benchmarks/fakes.py), Gemini/Groq by fake providers with configurable
+latency and error rates registered on ai_client's router, the knowledge
+base by a synthetic corpus, and the API is driven in-process through
+FastAPI's TestClient. Everything runs in a throwaway working directory, so
+the real database, logs and RAG snapshot are never touched.
+
+    cd backend
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --baseline bench.json --max-regression 0.2
+
+Results (throughput and p50/p95/p99 per stage) are printed and written as
+JSON; with --baseline the run exits with status 1 if any stage regressed by
+more than --max-regression.
+"""
+import os
+import sys
+import json
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STAGE_GROUPS = ("rag", "llm", "monitor", "dm", "api")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks with local stand-ins for Reddit and the LLMs.")
+    parser.add_argument("--output", default="bench_results.json", help="where to write the JSON results")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed relative slowdown vs. the baseline")
+    parser.add_argument("--only", nargs="+", choices=STAGE_GROUPS, default=list(STAGE_GROUPS), help="stage groups to run")
+    parser.add_argument("--workdir", help="working directory for the database and corpus (default: a temporary one)")
+    parser.add_argument("--keep", action="store_true", help="keep the working directory afterwards")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--concurrency", type=int, default=8, help="client threads for the LLM and API stages")
+    # Knowledge base / retrieval
+    parser.add_argument("--rag-docs", type=int, default=50)
+    parser.add_argument("--rag-paragraphs", type=int, default=20)
+    parser.add_argument("--rag-queries", type=int, default=2000)
+    # Fake LLM providers
+    parser.add_argument("--llm-calls", type=int, default=200)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="primary provider mean latency, seconds")
+    parser.add_argument("--llm-jitter", type=float, default=0.02)
+    parser.add_argument("--llm-error-rate", type=float, default=0.02)
+    parser.add_argument("--fallback-latency", type=float, default=0.1)
+    parser.add_argument("--fallback-error-rate", type=float, default=0.0)
+    parser.add_argument("--cache-entries", type=int, default=0, help="AI response cache size (0 measures the providers)")
+    # Fake Reddit
+    parser.add_argument("--monitor-cycles", type=int, default=20)
+    parser.add_argument("--posts-per-cycle", type=int, default=10, help="new posts per subreddit per monitor cycle")
+    parser.add_argument("--lead-ratio", type=float, default=0.3, help="share of posts containing a lead keyword")
+    parser.add_argument("--dm-cycles", type=int, default=10)
+    parser.add_argument("--dms-per-cycle", type=int, default=10)
+    parser.add_argument("--reply-latency", type=float, default=0.02, help="seconds message.reply() takes")
+    # API load
+    parser.add_argument("--requests", type=int, default=500, help="requests per API stage")
+    parser.add_argument("--batch-size", type=int, default=50, help="leads per /collector/leads request")
+    return parser.parse_args(argv)
+
+def prepare_environment(args, workdir):
+    """
+    Must run before any backend module is imported: utils reads the
+    environment at import time, and the database, logs and RAG paths are
+    relative to the working directory. Empty values win over backend/.env.
+    """
+    os.environ.update({
+        "GOOGLE_AI_API_KEY": "",
+        "GROQ_API_KEY": "",
+        "DISCORD_WEBHOOK_URL": "",
+        "ENABLE_BACKGROUND_JOBS": "",
+        "REDDIT_CLIENT_ID": "offline-benchmark",
+        "REDDIT_USERNAME": "benchmark_bot",
+        "RAG_SNAPSHOT_PATH": os.path.join(workdir, "data", "rag-index.snapshot"),
+        "RAG_RELOAD_INTERVAL": "0",
+        "AI_CACHE_MAX_ENTRIES": str(args.cache_entries),
+        "AI_CACHE_PERSIST": "",
+        "SYSTEM_LOG_LEVEL": args.log_level.upper(),
+    })
+    os.makedirs(os.path.join(workdir, "data"), exist_ok=True)
+    os.chdir(workdir)
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+
+def environment_info():
+    import sqlite3
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sqlite": sqlite3.sqlite_version,
+        "cpus": os.cpu_count(),
+        "git_commit": commit or None,
+    }
+
+def lead_payload(post):
+    return {
+        "id": post.id,
+        "title": post.title,
+        "body": post.selftext,
+        "subreddit": post.subreddit.display_name,
+        "author": str(post.author),
+        "url": post.url,
+        "score": 0,
+    }
+
+def bench_rag(recorder, args, vocabulary):
+    from rag import LighterRAG, rag_system
+    from benchmarks.corpus import make_queries
+
+    # Cold index builds from the text files, without the snapshot
+    recorder.run("rag.build_index", lambda i: LighterRAG(data_dir=rag_system.data_dir, snapshot_path="").reload(), 3)
+    queries = make_queries(vocabulary, args.rag_queries, seed=args.seed)
+    recorder.run("rag.retrieve", lambda i: rag_system.retrieve(queries[i]), len(queries))
+
+def bench_llm(recorder, args):
+    from ai_client import ai_client, FALLBACK_RESPONSE
+    from rag import rag_system
+    from benchmarks.fakes import QUESTIONS
+
+    prompts = [f"{QUESTIONS[i % len(QUESTIONS)]} (#{i})" for i in range(args.llm_calls)]
+    contexts = ["\n\n".join(rag_system.retrieve(prompt)) for prompt in prompts]
+    # The fallback reply means every provider failed: counted as an error
+    recorder.run(
+        "llm.generate_response",
+        lambda i: ai_client.generate_response(prompts[i], context=contexts[i]) != FALLBACK_RESPONSE,
+        len(prompts),
+        concurrency=args.concurrency,
+    )
+
+def bench_monitor(recorder, args, reddit):
+    import monitor
+
+    def setup(i):
+        reddit.publish(args.posts_per_cycle)
+        # Poll every subreddit each cycle instead of waiting for its adaptive interval
+        for stream in monitor.stream_monitor.streams.values():
+            stream.next_poll_at = 0.0
+
+    recorder.run("monitor.check_leads", lambda i: monitor.check_leads(), args.monitor_cycles, setup=setup)
+
+def bench_dm(recorder, args, reddit):
+    from dm_handler import check_dms
+    recorder.run("dm.check_dms", lambda i: check_dms(), args.dm_cycles, setup=lambda i: reddit.deliver(args.dms_per_cycle))
+
+def bench_api(recorder, args, client):
+    from benchmarks.fakes import FakeReddit, LEAD_PHRASES
+
+    source = FakeReddit(["benchmark"], lead_ratio=args.lead_ratio, seed=args.seed + 10)
+    batches = max(1, args.requests // 10)
+    source.publish(args.requests + batches * args.batch_size)
+    posts = [lead_payload(post) for post in source.posts["benchmark"]]
+    singles, rest = posts[:args.requests], posts[args.requests:]
+
+    def post_lead(i):
+        return client.post("/api/collector/lead", json=singles[i]).status_code == 200
+
+    def post_batch(i):
+        batch = rest[i * args.batch_size:(i + 1) * args.batch_size]
+        return client.post("/api/collector/leads", json=batch).status_code == 200
+
+    def list_leads(i):
+        return client.get("/api/leads", params={"limit": 100}).status_code == 200
+
+    terms = [phrase.split()[i % 2] for i, phrase in enumerate(LEAD_PHRASES * 2)]
+
+    def search(i):
+        return client.get("/api/search", params={"q": terms[i % len(terms)], "type": "leads"}).status_code == 200
+
+    recorder.run("api.collector_lead", post_lead, len(singles), concurrency=args.concurrency)
+    recorder.run("api.collector_leads", post_batch, batches, concurrency=args.concurrency)
+    recorder.run("api.list_leads", list_leads, args.requests, concurrency=args.concurrency)
+    recorder.run("api.search", search, args.requests, concurrency=args.concurrency)
+
+def print_summary(stages):
+    header = f"{'stage':<24}{'count':>7}{'errors':>8}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, s in stages.items():
+        print(f"{name:<24}{s['count']:>7}{s['errors']:>8}{s['throughput_per_second'] or 0:>10}"
+              f"{s['p50_ms'] or 0:>10}{s['p95_ms'] or 0:>10}{s['p99_ms'] or 0:>10}")
+
+def main(argv=None):
+    args = parse_args(argv)
+    output = os.path.abspath(args.output)
+    baseline = os.path.abspath(args.baseline) if args.baseline else None
+    workdir = os.path.abspath(args.workdir) if args.workdir else tempfile.mkdtemp(prefix="reddit-bench-")
+    original_cwd = os.getcwd()
+    prepare_environment(args, workdir)
+
+    from benchmarks.corpus import write_corpus
+    vocabulary = write_corpus(os.path.join(workdir, "data", "rag-knowledge"), documents=args.rag_docs,
+                              paragraphs=args.rag_paragraphs, seed=args.seed)
+
+    from fastapi.testclient import TestClient
+    from main import app
+    from ai_client import ai_client
+    from monitor import SUBREDDITS
+    from reddit_client import reddit_clients
+    from benchmarks.fakes import FakeReddit, FakeLLM
+    from benchmarks.harness import Recorder, compare
+
+    logging.getLogger().setLevel(args.log_level.upper())
+
+    reddit = FakeReddit(SUBREDDITS, lead_ratio=args.lead_ratio, reply_latency=args.reply_latency, seed=args.seed)
+    # Handed out by get_reddit_client() to the monitor and DM handler
+    reddit_clients._client = reddit
+    providers = [
+        FakeLLM("fake-primary", args.llm_latency, args.llm_jitter, args.llm_error_rate, seed=args.seed),
+        FakeLLM("fake-fallback", args.fallback_latency, args.llm_jitter, args.fallback_error_rate, seed=args.seed + 1),
+    ]
+    for provider in providers:
+        ai_client.router.add(provider.name, provider)
+
+    recorder = Recorder()
+    started_at = datetime.utcnow()
+    try:
+        # The lifespan runs init_db, the database writer, the log sink and the RAG warm-up
+        with TestClient(app) as client:
+            if "rag" in args.only:
+                bench_rag(recorder, args, vocabulary)
+            if "llm" in args.only:
+                bench_llm(recorder, args)
+            if "monitor" in args.only:
+                bench_monitor(recorder, args, reddit)
+            if "dm" in args.only:
+                bench_dm(recorder, args, reddit)
+            if "api" in args.only:
+                bench_api(recorder, args, client)
+    finally:
+        os.chdir(original_cwd)
+        if not args.keep and not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {
+        "started_at": started_at.isoformat(),
+        "environment": environment_info(),
+        "parameters": vars(args),
+        "stages": recorder.summary(),
+        "fakes": {
+            "reddit_listing_calls": reddit.calls,
+            "dms_answered": reddit.inbox.marked,
+            "llm": {provider.name: {"calls": provider.calls, "errors": provider.errors} for provider in providers},
+            "router": ai_client.provider_stats(),
+        },
+    }
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, default=str)
+
+    print_summary(results["stages"])
+    print(f"\nResults written to {output}")
+
+    if baseline:
+        with open(baseline, encoding="utf-8") as f:
+            rows, regressions = compare(results, json.load(f), args.max_regression)
+        print(f"\nCompared with {baseline}:")
+        for stage, key, old, new, change in rows:
+            flag = "  REGRESSION" if (stage, key, old, new, change) in regressions else ""
+            print(f"  {stage:<24}{key:<24}{old:>10} -> {new:<10}{change:+.1%}{flag}")
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,38 @@
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, Float, DateTime, Text, JSON
+from sqlalchemy import create_engine, event, inspect, text, Index, ForeignKey, Column, Integer, String, Boolean, Float, DateTime, Text, JSON
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
 import os
+import time
+from metrics import metrics
+from utils import config
 
 DATABASE_URL = "sqlite:///./data/leadstore.sqlite"
 
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+
+if config["DB_PERFORMANCE_MODE"]:
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL lets dashboard readers run alongside a writer instead of queueing behind it
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={config['DB_SYNCHRONOUS']}")
+        cursor.execute(f"PRAGMA cache_size={config['DB_CACHE_SIZE']}")
+        cursor.execute(f"PRAGMA mmap_size={config['DB_MMAP_SIZE']}")
+        cursor.execute(f"PRAGMA busy_timeout={config['DB_BUSY_TIMEOUT']}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+        # pysqlite's implicit BEGIN is replaced by begin_transaction below
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def begin_transaction(conn):
+        # The database writer takes the write lock up front, so it waits on busy_timeout
+        # instead of failing with "database is locked" when upgrading a read transaction
+        immediate = conn.get_execution_options().get("sqlite_immediate")
+        conn.exec_driver_sql("BEGIN IMMEDIATE" if immediate else "BEGIN")
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -22,7 +48,24 @@ class Lead(Base):
     author = Column(String)
     score = Column(Float, default=0.0)
     status = Column(String, default="new")  # new, ignored, contacted, bookmarked
+    intent = Column(String, nullable=True)  # seeking_work, hiring, discussion, spam
+    reasoning = Column(Text, nullable=True)
+    scored_at = Column(DateTime, nullable=True)  # set once the AI score has been written
     created_at = Column(DateTime, default=datetime.utcnow)
+    version = Column(Integer, nullable=False, server_default="1")  # global change counter at last write
+    fingerprint = Column(String, nullable=True)  # hex MinHash signature of title + body, see near_duplicates.py
+    duplicate_of = Column(String, nullable=True)  # reddit_id of the canonical lead this one near-duplicates
+    duplicate_count = Column(Integer, nullable=False, server_default="0")  # near-duplicates grouped under this lead
+
+    # Keyset pagination is (created_at, id) newest first; filters lead with their equality column
+    __table_args__ = (
+        Index("ix_leads_created_at_id", "created_at", "id"),
+        Index("ix_leads_status_created_at", "status", "created_at"),
+        Index("ix_leads_subreddit_created_at", "subreddit", "created_at"),
+        Index("ix_leads_score", "score"),
+        Index("ix_leads_version_id", "version", "id"),
+        Index("ix_leads_duplicate_of", "duplicate_of"),
+    )
 
 class Conversation(Base):
     __tablename__ = "conversations"
@@ -30,9 +73,34 @@ class Conversation(Base):
     reddit_username = Column(String, unique=True, index=True)
     status = Column(String, default="new")  # new, engaged, qualified, closed
     last_message_at = Column(DateTime, default=datetime.utcnow)
-    messages = Column(JSON, default=list) # List of {role: "user"|"assistant", content: "..."}
+    # Pre-migration history ({role, content, timestamp} list); moved into the messages table by init_db()
+    legacy_messages = Column("messages", JSON(none_as_null=True), nullable=True)
     human_takeover = Column(Boolean, default=False)
     notes = Column(Text, nullable=True)
+    version = Column(Integer, nullable=False, server_default="1")
+    # Denormalized by message_store.append_messages so list views never touch the history
+    last_message_preview = Column(String, nullable=True)
+    message_count = Column(Integer, nullable=False, server_default="0")
+
+    __table_args__ = (
+        Index("ix_conversations_last_message_at_id", "last_message_at", "id"),
+        Index("ix_conversations_status_last_message_at", "status", "last_message_at"),
+        Index("ix_conversations_version_id", "version", "id"),
+    )
+
+class Message(Base):
+    __tablename__ = "messages"
+    id = Column(Integer, primary_key=True)
+    conversation_id = Column(Integer, ForeignKey("conversations.id"), nullable=False)
+    role = Column(String)  # user, assistant, system
+    content = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    external_id = Column(String, nullable=True)  # Reddit message fullname etc., makes appends idempotent
+
+    __table_args__ = (
+        Index("ix_messages_conversation_id_id", "conversation_id", "id"),
+        Index("ix_messages_external_id", "external_id", unique=True),
+    )
 
 class PostTemplate(Base):
     __tablename__ = "post_templates"
@@ -52,13 +120,170 @@ class SystemLog(Base):
     module = Column(String) # monitor, dm_handler, scheduler
     message = Column(Text)
 
+    __table_args__ = (
+        Index("ix_system_logs_timestamp_id", "timestamp", "id"),
+        Index("ix_system_logs_level_timestamp", "level", "timestamp"),
+    )
+
+class LogRollup(Base):
+    __tablename__ = "log_rollups"
+    minute = Column(DateTime, primary_key=True)  # UTC, truncated to the minute
+    module = Column(String, primary_key=True)
+    level = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class PendingNotification(Base):
+    __tablename__ = "pending_notifications"
+    id = Column(Integer, primary_key=True, index=True)
+    webhook_url = Column(String)
+    content = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    attempts = Column(Integer, default=0)  # failed delivery rounds since it was spilled
+
+class ResponseCacheEntry(Base):
+    __tablename__ = "llm_response_cache"
+    key = Column(String, primary_key=True)  # sha256 of normalized model + context + prompt
+    model = Column(String)
+    response = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
 class Settings(Base):
     __tablename__ = "settings"
     key = Column(String, primary_key=True)
     value = Column(JSON)
 
+class SyncCounter(Base):
+    __tablename__ = "sync_counter"
+    id = Column(Integer, primary_key=True)
+    value = Column(Integer, nullable=False)
+
+CONVERSATION_PREVIEW_CHARS = 200
+
+# Lead columns only the backend reads; left out of list, search and event payloads
+LEAD_INTERNAL_COLUMNS = ("fingerprint",)
+
+# Rows stamped with the global change counter on every insert/update, for the /changes feeds
+VERSIONED_MODELS = (Lead, Conversation)
+
+def next_version(connection):
+    """Atomically bumps the global change counter (the UPDATE takes SQLite's write lock)."""
+    value = connection.execute(text("UPDATE sync_counter SET value = value + 1 WHERE id = 1 RETURNING value")).scalar()
+    if value is None:
+        connection.execute(text("INSERT INTO sync_counter (id, value) VALUES (1, 2)"))
+        value = 2
+    return value
+
+@event.listens_for(SessionLocal, "before_flush")
+def stamp_versions(session, flush_context, instances):
+    changed = [obj for obj in session.new if isinstance(obj, VERSIONED_MODELS)]
+    changed += [obj for obj in session.dirty if isinstance(obj, VERSIONED_MODELS) and session.is_modified(obj)]
+    if changed:
+        version = next_version(session.connection())
+        for obj in changed:
+            obj.version = version
+
+db_commit_seconds = metrics.histogram("db_commit_seconds", "Session flush + commit time")
+
+@event.listens_for(SessionLocal, "before_commit")
+def start_commit_timer(session):
+    session.info["commit_started"] = time.perf_counter()
+
+@event.listens_for(SessionLocal, "after_commit")
+def record_commit_time(session):
+    started = session.info.pop("commit_started", None)
+    if started is not None:
+        db_commit_seconds.observe(time.perf_counter() - started)
+
+def migrate_schema():
+    # create_all() never alters existing tables, so add columns and indexes introduced since they were created
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    if column.server_default is not None:
+                        column_type += f" DEFAULT {column.server_default.arg}"
+                        if not column.nullable:
+                            column_type += " NOT NULL"
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'))
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+# FTS5 indexes over lead and message text. They are external-content tables (the text is
+# only stored once, in the source table) kept in sync by triggers, so every write path
+# is covered: ORM flushes, the collector's Core inserts and the legacy message migration.
+SEARCH_INDEXES = {
+    "leads_fts": ("leads", ("title", "body")),
+    "messages_fts": ("messages", ("content",)),
+}
+
+def search_index_ddl(name, source, columns):
+    column_list = ", ".join(columns)
+    new_values = ", ".join(f"new.{column}" for column in columns)
+    old_values = ", ".join(f"old.{column}" for column in columns)
+    delete_old = f"INSERT INTO {name}({name}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});"
+    insert_new = f"INSERT INTO {name}(rowid, {column_list}) VALUES (new.id, {new_values});"
+    return [
+        f"CREATE VIRTUAL TABLE {name} USING fts5({column_list}, content='{source}', content_rowid='id', tokenize='porter unicode61')",
+        f"CREATE TRIGGER {name}_insert AFTER INSERT ON {source} BEGIN {insert_new} END",
+        f"CREATE TRIGGER {name}_delete AFTER DELETE ON {source} BEGIN {delete_old} END",
+        f"CREATE TRIGGER {name}_update AFTER UPDATE OF {column_list} ON {source} BEGIN {delete_old} {insert_new} END",
+    ]
+
+def create_search_indexes():
+    """Creates missing FTS tables and their triggers, filling new ones from the rows already stored."""
+    with engine.begin() as conn:
+        for name, (source, columns) in SEARCH_INDEXES.items():
+            if conn.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": name}).first():
+                continue
+            for statement in search_index_ddl(name, source, columns):
+                conn.exec_driver_sql(statement)
+            conn.exec_driver_sql(f"INSERT INTO {name}({name}) VALUES ('rebuild')")
+
 def init_db():
     Base.metadata.create_all(bind=engine)
+    migrate_schema()
+    # Existing rows start at version 1, so the counter starts there too
+    with engine.begin() as conn:
+        conn.execute(text("INSERT OR IGNORE INTO sync_counter (id, value) VALUES (1, 1)"))
+    create_search_indexes()
+    migrate_legacy_messages()
+
+def parse_timestamp(value):
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+def migrate_legacy_messages(batch_size=100):
+    """Moves histories still stored in the conversations.messages JSON column into the messages table."""
+    db = SessionLocal()
+    try:
+        while True:
+            pending = db.query(Conversation).filter(Conversation.legacy_messages.isnot(None)).limit(batch_size).all()
+            if not pending:
+                break
+            for conversation in pending:
+                history = conversation.legacy_messages or []
+                for item in history:
+                    db.add(Message(
+                        conversation_id=conversation.id,
+                        role=item.get("role"),
+                        content=item.get("content"),
+                        created_at=parse_timestamp(item.get("timestamp")) or conversation.last_message_at,
+                    ))
+                conversation.message_count = len(history)
+                conversation.last_message_preview = (history[-1].get("content") or "")[:CONVERSATION_PREVIEW_CHARS] if history else None
+                conversation.legacy_messages = None
+            db.commit()
+    finally:
+        db.close()
 
 def get_db():
     db = SessionLocal()
@@ -0,0 +1,115 @@
+import queue
+import threading
+from concurrent.futures import Future
+from database import SessionLocal, engine
+from utils import get_logger, config
+
+logger = get_logger(__name__)
+
+class DatabaseWriter:
+    """
+    Runs write jobs one at a time on a dedicated thread. Jobs that queue up
+    while a transaction is in progress are committed together in the next
+    one (up to `max_batch`), so a burst of small collector writes costs a
+    single commit instead of one each and writers never contend for the
+    SQLite lock. If a job raises, the batch is rolled back and its jobs are
+    replayed in their own transactions so only the failing one sees the error.
+
+    A job is a callable taking the writer's session. It must not commit and
+    should return plain values: ORM objects are expired once the batch commits.
+    """
+    def __init__(self, max_batch=100):
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._bind = engine.execution_options(sqlite_immediate=True)
+        self.jobs = 0
+        self.failures = 0
+        self.commits = 0
+        self.largest_batch = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="db-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=10):
+        """Commits whatever is queued, then stops the writer thread."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def submit(self, job):
+        """Queues a job and returns a concurrent Future for its result."""
+        future = Future()
+        self.start()
+        self._queue.put((job, future))
+        return future
+
+    def run(self, job):
+        """Queues a job and blocks until it has been committed. Never call it from inside a job."""
+        return self.submit(job).result()
+
+    def _loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stopping = False
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            batch = [(job, future) for job, future in batch if future.set_running_or_notify_cancel()]
+            if batch:
+                self._write(batch)
+            if stopping:
+                return
+
+    def _write(self, batch):
+        db = SessionLocal(bind=self._bind)
+        try:
+            results = [job(db) for job, _ in batch]
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            if len(batch) == 1:
+                self.failures += 1
+                logger.error(f"Database write failed: {e}")
+                batch[0][1].set_exception(e)
+                return
+            # Find the failing job: replay each one in its own transaction
+            for item in batch:
+                self._write([item])
+            return
+        finally:
+            db.close()
+
+        self.jobs += len(batch)
+        self.commits += 1
+        self.largest_batch = max(self.largest_batch, len(batch))
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def stats(self):
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "queued": self._queue.qsize(),
+            "jobs": self.jobs,
+            "commits": self.commits,
+            "failures": self.failures,
+            "largest_batch": self.largest_batch,
+        }
+
+db_writer = DatabaseWriter(max_batch=config["DB_WRITE_BATCH_SIZE"])
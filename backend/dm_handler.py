@@ -1,99 +1,168 @@
 import praw
-import requests
-import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from database import SessionLocal, Conversation
+from db_writer import db_writer
+from message_store import append_messages, get_or_create_conversation
+from metrics import metrics
+from notifier import notifier
 from ai_client import ai_client
 from rag import rag_system
-from monitor import get_reddit_client
+from reddit_client import get_reddit_client
 from utils import get_logger, config
 
 logger = get_logger(__name__)
 
+job_seconds = metrics.histogram("job_duration_seconds", "Background job run time")
+reply_seconds = metrics.histogram("reddit_reply_seconds", "Time for message.reply() to return")
+replies_total = metrics.counter("dm_replies_total", "DMs handled, by outcome")
+
+# Senders processed concurrently per check_dms() cycle
+DM_WORKERS = config["DM_WORKERS"]
+
 def send_dm_notification(username, message, reply):
-    webhook_url = config.get("DISCORD_WEBHOOK_URL")
-    if not webhook_url:
-        return
+    notifier.notify(f"💬 **New DM from u/{username}**\n\n**User:** {message}\n\n**AI Reply:** {reply}")
+
+def build_reply(body):
+    # RAG Retrieval
+    context_docs = rag_system.retrieve(body)
+    context_text = "\n\n".join(context_docs)
     
-    data = {
-        "content": f"💬 **New DM from u/{username}**\n\n**User:** {message}\n\n**AI Reply:** {reply}"
-    }
-    try:
-        requests.post(webhook_url, json=data)
-    except Exception as e:
-        logger.error(f"Failed to send Discord DM notification: {e}")
+    # Generate AI Response
+    response_text = ai_client.generate_response(body, context=context_text)
+    
+    # Append Footer for Compliance
+    response_text += "\n\n*(This is an automated message by /u/" + config["REDDIT_USERNAME"] + "'s AI assistant)*"
+    return response_text
+
+def process_sender(sender, messages):
+    """
+    Replies to one sender's unread DMs strictly in order. Runs on a pool
+    thread, so it only talks to Reddit and the LLMs; DB writes happen later.
+    Each DM is marked read as soon as it is answered, so a failed history
+    write can never get it answered twice.
+    """
+    results = []
+    for message in messages:
+        received_at = datetime.utcnow()
+        try:
+            response_text = build_reply(message.body)
+            with reply_seconds.time():
+                message.reply(response_text)
+        except Exception as e:
+            replies_total.inc(outcome="failed")
+            logger.error(f"Failed to reply to {sender}: {e}")
+            # Stop here so a later message is never answered before an earlier one
+            break
+        replies_total.inc(outcome="replied")
+        results.append({
+            "message": message,
+            "received_at": received_at,
+            "reply": response_text,
+            "replied_at": datetime.utcnow(),
+        })
+        try:
+            message.mark_read()
+        except Exception as e:
+            logger.error(f"Failed to mark DM from {sender} as read: {e}")
+    return results
 
+@job_seconds.timed(job="check_dms")
 def check_dms():
     logger.info("Checking DMs...")
     reddit = get_reddit_client()
     if not reddit:
         return
 
-    db = SessionLocal()
     try:
+        # Fetch the unread batch and group DMs by sender, keeping arrival order
+        by_sender = {}
+        to_mark_read = []
         for message in reddit.inbox.unread(limit=10):
             # Check if it's a DM (not comment reply)
             if not isinstance(message, praw.models.Message):
-                message.mark_read() # Mark comment replies as read or handle differently
+                to_mark_read.append(message) # Mark comment replies as read or handle differently
                 continue
-                
-            sender = str(message.author)
-            logger.info(f"Processing DM from {sender}")
-            
-            # Get or create conversation
-            conversation = db.query(Conversation).filter(Conversation.reddit_username == sender).first()
-            if not conversation:
-                conversation = Conversation(
-                    reddit_username=sender,
-                    messages=[],
-                    status="new"
+            by_sender.setdefault(str(message.author), []).append(message)
+
+        if not by_sender:
+            if to_mark_read:
+                reddit.inbox.mark_read(to_mark_read)
+            return
+
+        # Senders under human takeover, in one query; everyone else (new senders too) gets a reply
+        db = SessionLocal()
+        try:
+            taken_over = {
+                row[0] for row in db.query(Conversation.reddit_username).filter(
+                    Conversation.reddit_username.in_(list(by_sender)), Conversation.human_takeover.is_(True)
                 )
-                db.add(conversation)
-                db.commit()
-            
-            if conversation.human_takeover:
-                logger.info(f"Skipping auto-reply for {sender} (Human Takeover)")
-                # Optionally mark read so we don't process again, but user needs to see it? 
-                # If we mark read, we won't see it in unread.
-                # Usually we want to ingest it into DB message history but not reply.
-                msg_history = list(conversation.messages) if conversation.messages else []
-                msg_history.append({"role": "user", "content": message.body, "timestamp": str(datetime.utcnow())})
-                conversation.messages = msg_history
-                db.commit()
-                message.mark_read()
-                send_dm_notification(sender, message.body, "[Human Takeover Active - No AI Reply]")
+            }
+        finally:
+            db.close()
+
+        history = {}  # sender -> message items to append
+        notifications = []
+        auto_reply = {}
+        for sender, messages in by_sender.items():
+            if sender not in taken_over:
+                auto_reply[sender] = messages
                 continue
 
-            # RAG Retrieval
-            context_docs = rag_system.retrieve(message.body)
-            context_text = "\n\n".join(context_docs)
-            
-            # Generate AI Response
-            response_text = ai_client.generate_response(message.body, context=context_text)
-            
-            # Append Footer for Compliance
-            response_text += "\n\n*(This is an automated message by /u/" + config["REDDIT_USERNAME"] + "'s AI assistant)*"
-            
-            # Send Reply
-            try:
-                message.reply(response_text)
-                message.mark_read()
-                
-                # Update DB
-                msg_history = list(conversation.messages) if conversation.messages else []
-                msg_history.append({"role": "user", "content": message.body, "timestamp": str(datetime.utcnow())})
-                msg_history.append({"role": "assistant", "content": response_text, "timestamp": str(datetime.utcnow())})
-                conversation.messages = msg_history
-                conversation.last_message_at = datetime.utcnow()
-                conversation.status = "engaged"
-                db.commit()
-                
-                send_dm_notification(sender, message.body, response_text)
-                
-            except Exception as e:
-                logger.error(f"Failed to reply to {sender}: {e}")
-                
+            logger.info(f"Skipping auto-reply for {sender} (Human Takeover)")
+            # Ingest into DB message history but don't reply
+            history[sender] = [
+                {"role": "user", "content": message.body, "timestamp": datetime.utcnow(), "external_id": message.fullname}
+                for message in messages
+            ]
+            replies_total.inc(len(messages), outcome="takeover")
+            for message in messages:
+                to_mark_read.append(message)
+                notifications.append((sender, message.body, "[Human Takeover Active - No AI Reply]"))
+
+        # Fan out retrieval + generation + reply across senders; each sender stays sequential
+        results = {}
+        if auto_reply:
+            workers = min(DM_WORKERS, len(auto_reply))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dm") as executor:
+                futures = {executor.submit(process_sender, sender, messages): sender for sender, messages in auto_reply.items()}
+                for future in as_completed(futures):
+                    sender = futures[future]
+                    logger.info(f"Processed DMs from {sender}")
+                    results[sender] = future.result()
+
+        engaged = {}  # sender -> time of the last reply
+        for sender, replies in results.items():
+            if not replies:
+                continue
+            items = []
+            for item in replies:
+                message = item["message"]
+                items.append({"role": "user", "content": message.body, "timestamp": item["received_at"], "external_id": message.fullname})
+                items.append({"role": "assistant", "content": item["reply"], "timestamp": item["replied_at"], "external_id": f"reply:{message.fullname}"})
+                notifications.append((sender, message.body, item["reply"]))
+            history[sender] = items
+            engaged[sender] = replies[-1]["replied_at"]
+
+        def write(db):
+            for sender, items in history.items():
+                conversation = get_or_create_conversation(db, sender)
+                # Append-only inserts; the history is never rewritten
+                append_messages(db, conversation, items)
+                if sender in engaged:
+                    conversation.last_message_at = engaged[sender]
+                    conversation.status = "engaged"
+
+        # Batch the DB writes for the whole cycle into one writer job, so no
+        # transaction is held open while the LLMs and Reddit are called
+        if history:
+            db_writer.run(write)
+
+        if to_mark_read:
+            reddit.inbox.mark_read(to_mark_read)
+
+        for sender, body, reply in notifications:
+            send_dm_notification(sender, body, reply)
+
     except Exception as e:
         logger.error(f"Error handling DMs: {e}")
-    finally:
-        db.close()
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import threading
+from collections import deque
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event, inspect
+from database import SessionLocal, LEAD_INTERNAL_COLUMNS, Lead, Conversation, Message, SystemLog
+from utils import get_logger, config
+
+logger = get_logger(__name__)
+
+class Subscriber:
+    def __init__(self, loop, max_queue):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = False
+
+class EventBus:
+    """
+    In-process pub/sub for the dashboard event stream. publish() is safe to
+    call from any thread; every subscriber gets a bounded queue and is
+    disconnected (not waited on) if it falls behind. Recent events are kept
+    in a ring buffer so a reconnecting client can resume from its last id.
+    """
+    def __init__(self, buffer_size=1000, max_queue=200):
+        self.max_queue = max_queue
+        self._buffer = deque(maxlen=buffer_size)
+        self._subscribers = set()
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self.published = 0
+        self.dropped_subscribers = 0
+
+    def publish(self, event_type, data):
+        with self._lock:
+            event = {"id": self._next_id, "type": event_type, "data": jsonable_encoder(data)}
+            self._next_id += 1
+            self._buffer.append(event)
+            self.published += 1
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(self._deliver, subscriber, event)
+            except RuntimeError:
+                # Loop already closed
+                self.unsubscribe(subscriber)
+        return event
+
+    def _deliver(self, subscriber, event):
+        # Runs on the subscriber's event loop
+        if subscriber.dropped:
+            return
+        try:
+            subscriber.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.warning("Dropping slow event stream subscriber")
+            subscriber.dropped = True
+            self.unsubscribe(subscriber)
+            self.dropped_subscribers += 1
+            while not subscriber.queue.empty():
+                subscriber.queue.get_nowait()
+            # Sentinel: tells the stream to close so the client reconnects and resumes
+            subscriber.queue.put_nowait(None)
+
+    def subscribe(self, last_event_id=None):
+        """
+        Registers a subscriber on the running loop. Returns (subscriber, backlog),
+        where backlog holds the buffered events after last_event_id, or a single
+        "reset" event if that id is no longer buffered (the client should reload).
+        """
+        subscriber = Subscriber(asyncio.get_running_loop(), self.max_queue)
+        with self._lock:
+            backlog = []
+            if last_event_id is not None:
+                oldest = self._buffer[0]["id"] if self._buffer else self._next_id
+                if last_event_id + 1 < oldest or last_event_id >= self._next_id:
+                    backlog = [{"id": self._next_id - 1, "type": "reset", "data": {}}]
+                else:
+                    backlog = [e for e in self._buffer if e["id"] > last_event_id]
+            self._subscribers.add(subscriber)
+        return subscriber, backlog
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "published": self.published,
+                "buffered": len(self._buffer),
+                "last_event_id": self._next_id - 1,
+                "dropped_subscribers": self.dropped_subscribers,
+            }
+
+def format_sse(event):
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+
+def _row(obj, exclude=()):
+    return {c.key: getattr(obj, c.key) for c in inspect(obj).mapper.column_attrs if c.key not in exclude}
+
+def _conversation_event(obj, is_new):
+    data = _row(obj, exclude=("legacy_messages",))
+    if not is_new and inspect(obj).attrs.human_takeover.history.has_changes():
+        return "takeover", data
+    return "conversation", data
+
+# Events are collected at flush time (while the rows are still loaded) and published after commit
+@event.listens_for(SessionLocal, "after_flush")
+def collect_events(session, flush_context):
+    pending = session.info.setdefault("pending_events", [])
+    logs = []
+    for obj in session.new:
+        if isinstance(obj, Lead):
+            pending.append(("lead", _row(obj, exclude=LEAD_INTERNAL_COLUMNS)))
+        elif isinstance(obj, Conversation):
+            pending.append(_conversation_event(obj, True))
+        elif isinstance(obj, Message):
+            pending.append(("message", _row(obj)))
+        elif isinstance(obj, SystemLog):
+            logs.append(_row(obj))
+    if logs:
+        # Log rows come in bursts: one event per flush, the same shape the log sink publishes
+        pending.append(("log", {"count": len(logs), "rows": logs}))
+    for obj in session.dirty:
+        if isinstance(obj, Conversation) and session.is_modified(obj):
+            pending.append(_conversation_event(obj, False))
+        elif isinstance(obj, Lead) and session.is_modified(obj):
+            pending.append(("lead_updated", _row(obj, exclude=LEAD_INTERNAL_COLUMNS)))
+
+@event.listens_for(SessionLocal, "after_commit")
+def publish_events(session):
+    for event_type, data in session.info.pop("pending_events", []):
+        event_bus.publish(event_type, data)
+
+@event.listens_for(SessionLocal, "after_rollback")
+def discard_events(session):
+    session.info.pop("pending_events", None)
+
+event_bus = EventBus(buffer_size=config["EVENT_BUFFER_SIZE"], max_queue=config["EVENT_QUEUE_SIZE"])
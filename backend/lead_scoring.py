@@ -0,0 +1,146 @@
+import re
+import json
+from datetime import datetime
+from ai_client import ai_client
+from database import Lead
+from utils import get_logger, config
+
+logger = get_logger(__name__)
+
+INTENTS = ("seeking_work", "hiring", "discussion", "spam")
+
+# Bodies are truncated so a whole listing fits in one prompt
+MAX_BODY_CHARS = 1500
+
+SCORING_PROMPT = """You score Reddit posts for a 100% commission-based remote sales role.
+For each post below decide how likely the author is a good candidate for the role.
+
+Respond with ONLY a JSON array, no prose and no code fences. One object per post:
+{{"id": "<post id>", "score": <integer 0-100>, "intent": "<one of: {intents}>", "reasoning": "<one short sentence>"}}
+
+Posts:
+{posts}
+"""
+
+JSON_ARRAY_RE = re.compile(r"\[.*\]", re.DOTALL)
+
+class LeadScorer:
+    """
+    Scores many posts per LLM call against a strict JSON schema. Items that
+    are missing or invalid in the response are retried on their own, one
+    post per call. Only responses in which every item validated are cached.
+    """
+    def __init__(self, client=ai_client, batch_size=10, max_retries=2):
+        self.client = client
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+
+    def _build_prompt(self, posts):
+        payload = [
+            {"id": post["id"], "title": post["title"], "body": (post.get("body") or "")[:MAX_BODY_CHARS]}
+            for post in posts
+        ]
+        return SCORING_PROMPT.format(intents=", ".join(INTENTS), posts=json.dumps(payload, ensure_ascii=False, indent=1))
+
+    @staticmethod
+    def parse_response(text):
+        """Returns {post id: raw item} for every object in the JSON array, or {} if there is none."""
+        if not text:
+            return {}
+        match = JSON_ARRAY_RE.search(text)
+        if not match:
+            return {}
+        try:
+            items = json.loads(match.group(0))
+        except ValueError:
+            return {}
+        if not isinstance(items, list):
+            return {}
+        return {str(item["id"]): item for item in items if isinstance(item, dict) and "id" in item}
+
+    @staticmethod
+    def validate(item):
+        """Returns a clean {"score", "intent", "reasoning"} dict, or None if the item is unusable."""
+        try:
+            score = float(item["score"])
+        except (KeyError, TypeError, ValueError):
+            return None
+        intent = str(item.get("intent", "")).strip().lower()
+        if intent not in INTENTS:
+            return None
+        reasoning = item.get("reasoning")
+        if not isinstance(reasoning, str):
+            return None
+        return {"score": max(0.0, min(100.0, score)), "intent": intent, "reasoning": reasoning.strip()}
+
+    def _validate_all(self, posts, response):
+        parsed = self.parse_response(response)
+        results = {}
+        for post in posts:
+            item = parsed.get(str(post["id"]))
+            result = self.validate(item) if item else None
+            if result:
+                results[post["id"]] = result
+        return results
+
+    def _score_batch(self, posts):
+        response = self.client.complete(
+            self._build_prompt(posts),
+            # A cached answer that failed validation would fail every retry too
+            cache_if=lambda text: len(self._validate_all(posts, text)) == len(posts),
+        )
+        return self._validate_all(posts, response)
+
+    def score_posts(self, posts):
+        """
+        posts: list of {"id", "title", "body"} dicts.
+        Returns {post id: {"score", "intent", "reasoning"}}; posts that could not
+        be scored after the retries are left out.
+        """
+        results = {}
+        pending = list(posts)
+        for attempt in range(self.max_retries + 1):
+            if not pending:
+                break
+            # Retries go one post per call, so a post the model keeps fumbling can't sink the rest
+            batch_size = self.batch_size if attempt == 0 else 1
+            for i in range(0, len(pending), batch_size):
+                results.update(self._score_batch(pending[i:i + batch_size]))
+            pending = [post for post in pending if post["id"] not in results]
+            if pending and attempt < self.max_retries:
+                logger.warning(f"Retrying scoring for {len(pending)} posts with invalid results")
+
+        if pending:
+            logger.error(f"Could not score {len(pending)} posts: {', '.join(str(post['id']) for post in pending)}")
+        return results
+
+def apply_score(lead, result):
+    lead.score = result["score"]
+    lead.intent = result["intent"]
+    lead.reasoning = result["reasoning"]
+    lead.scored_at = datetime.utcnow()
+
+def score_unscored_leads(db, limit=100):
+    """Scores leads that have no AI score yet (e.g. collected by the Devvit bot) and writes it back."""
+    # Near-duplicates are not sent to the LLM: they take their canonical lead's score
+    leads = (
+        db.query(Lead)
+        .filter(Lead.scored_at.is_(None), Lead.duplicate_of.is_(None))
+        .order_by(Lead.created_at.desc())
+        .limit(limit)
+        .all()
+    )
+    if not leads:
+        return 0
+    results = lead_scorer.score_posts([{"id": lead.reddit_id, "title": lead.title, "body": lead.body} for lead in leads])
+    for lead in leads:
+        if lead.reddit_id in results:
+            apply_score(lead, results[lead.reddit_id])
+    if results:
+        duplicates = db.query(Lead).filter(Lead.duplicate_of.in_(list(results)), Lead.scored_at.is_(None))
+        for duplicate in duplicates:
+            apply_score(duplicate, results[duplicate.duplicate_of])
+    db.commit()
+    return len(results)
+
+lead_scorer = LeadScorer(batch_size=config["LEAD_SCORING_BATCH_SIZE"])
@@ -0,0 +1,187 @@
+import time
+import queue
+import logging
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from logging.handlers import QueueHandler
+from sqlalchemy import delete, func
+from sqlalchemy.dialects.sqlite import insert
+from database import SystemLog, LogRollup
+from db_writer import db_writer
+from events import event_bus
+from utils import get_logger, config
+
+logger = get_logger(__name__)
+
+# Rows per INSERT statement (4 bound parameters each)
+INSERT_CHUNK_SIZE = 500
+# Loggers on the sink's own write path
+UNSTORED_LOGGERS = {__name__, "db_writer"}
+
+class SystemLogHandler(QueueHandler):
+    """Hands records to the sink's queue; drops them rather than block when it is full."""
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        # The sink's own failures and the writer's stay in system.log: stored as more
+        # rows, every failed write would queue another one and a broken database would feed itself
+        self.addFilter(lambda record: record.name not in UNSTORED_LOGGERS)
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class SystemLogSink:
+    """
+    Stores log records in system_logs for the dashboard. Records are queued
+    by a root logger handler and bulk-inserted by a background thread every
+    `flush_interval` seconds (or every `batch_size` records), together with
+    per-minute counts by module and level in log_rollups. Rows older than
+    the retention period or beyond `max_rows` are pruned periodically.
+    """
+    def __init__(self, level="INFO", batch_size=200, flush_interval=1.0, max_queue=10000,
+                 max_rows=50000, retention_days=7, rollup_retention_days=30, prune_interval=300):
+        self.level = level
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_rows = max_rows
+        self.retention_days = retention_days
+        self.rollup_retention_days = rollup_retention_days
+        self.prune_interval = prune_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self.handler = None
+        self._thread = None
+        self.written = 0
+        self.pruned = 0
+        self.failures = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self.handler = SystemLogHandler(self._queue)
+        self.handler.setLevel(self.level)
+        logging.getLogger().addHandler(self.handler)
+        self._thread = threading.Thread(target=self._loop, name="log-sink", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10):
+        """Detaches the handler and writes whatever is still queued."""
+        if self._thread is None:
+            return
+        logging.getLogger().removeHandler(self.handler)
+        # Blocking put: the sentinel must not be dropped even if the queue is full
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _loop(self):
+        next_prune = time.monotonic()
+        while True:
+            batch = []
+            stopping = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    record = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if record is None:
+                    stopping = True
+                    break
+                batch.append(record)
+
+            if batch:
+                self.flush(batch)
+            if time.monotonic() >= next_prune:
+                self.prune()
+                next_prune = time.monotonic() + self.prune_interval
+            if stopping:
+                return
+
+    def flush(self, records):
+        rows = [
+            {
+                "timestamp": datetime.utcfromtimestamp(record.created),
+                "level": record.levelname,
+                "module": record.name,
+                "message": record.getMessage(),
+            }
+            for record in records
+        ]
+        rollups = Counter((row["timestamp"].replace(second=0, microsecond=0), row["module"], row["level"]) for row in rows)
+
+        def write(db):
+            written = []
+            for i in range(0, len(rows), INSERT_CHUNK_SIZE):
+                chunk = rows[i:i + INSERT_CHUNK_SIZE]
+                ids = db.execute(insert(SystemLog).values(chunk).returning(SystemLog.id)).scalars().all()
+                written.extend(dict(row, id=row_id) for row, row_id in zip(chunk, ids))
+            stmt = insert(LogRollup).values([
+                {"minute": minute, "module": module, "level": level, "count": count}
+                for (minute, module, level), count in rollups.items()
+            ])
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=["minute", "module", "level"],
+                set_={"count": LogRollup.count + stmt.excluded.count},
+            ))
+            return written
+
+        try:
+            written = db_writer.run(write)
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Could not store {len(rows)} log records: {e}")
+            return
+        self.written += len(written)
+
+        # Core inserts bypass the session event hooks, so announce the new rows here,
+        # as one event per flush rather than one per row
+        event_bus.publish("log", {"count": len(written), "rows": written})
+
+    def prune(self):
+        now = datetime.utcnow()
+
+        def write(db):
+            deleted = db.execute(
+                delete(SystemLog).where(SystemLog.timestamp < now - timedelta(days=self.retention_days))
+            ).rowcount
+            if self.max_rows:
+                # Ids only grow, so everything more than max_rows below the newest id is surplus
+                newest = db.query(func.max(SystemLog.id)).scalar()
+                if newest and newest > self.max_rows:
+                    deleted += db.execute(delete(SystemLog).where(SystemLog.id <= newest - self.max_rows)).rowcount
+            db.execute(delete(LogRollup).where(LogRollup.minute < now - timedelta(days=self.rollup_retention_days)))
+            return deleted
+
+        try:
+            deleted = db_writer.run(write)
+        except Exception as e:
+            logger.error(f"Log pruning failed: {e}")
+            return
+        if deleted:
+            self.pruned += deleted
+            logger.info(f"Pruned {deleted} old log rows")
+
+    def stats(self):
+        return {
+            "running": self._thread is not None,
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.handler.dropped if self.handler else 0,
+            "failures": self.failures,
+            "pruned": self.pruned,
+        }
+
+log_sink = SystemLogSink(
+    level=config["SYSTEM_LOG_LEVEL"],
+    batch_size=config["SYSTEM_LOG_BATCH_SIZE"],
+    max_rows=config["SYSTEM_LOG_MAX_ROWS"],
+    retention_days=config["SYSTEM_LOG_RETENTION_DAYS"],
+    rollup_retention_days=config["LOG_ROLLUP_RETENTION_DAYS"],
+)
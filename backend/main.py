@@ -1,68 +1,79 @@
-import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from database import init_db
+from database import init_db, SessionLocal
 from api import router
-from monitor import check_leads
+from monitor import check_leads, monitor_interval
 from dm_handler import check_dms
 from scheduler import check_scheduled_posts
-from utils import get_random_interval, get_logger
+from rag import rag_system
+from workers import worker_manager
+from db_writer import db_writer
+from log_sink import log_sink
+from notifier import notifier
+from near_duplicates import duplicate_index
+from metrics import metrics, MetricsMiddleware
+from pagination import NEXT_CURSOR_HEADER, SYNC_CURSOR_HEADER
+from utils import get_logger, config
 
 logger = get_logger("main")
 
-# Background tasks
-async def background_monitor():
-    while True:
-        try:
-            logger.info("Starting monitor check...")
-            check_leads() # Using synchronous version, potentially blocking if not using async praw or threading
-            # For this value demo, blocking is acceptable in a background thread/task if concise
-        except Exception as e:
-            logger.error(f"Error in monitor loop: {e}")
-        
-        interval = get_random_interval()
-        logger.info(f"Monitor sleeping for {interval} seconds")
-        await asyncio.sleep(interval)
-
-async def background_dm_check():
-    while True:
-        try:
-            check_dms()
-        except Exception as e:
-            logger.error(f"Error in DM loop: {e}")
-        await asyncio.sleep(60) # Check DMs every minute
-
-async def background_scheduler():
-    while True:
-        try:
-            check_scheduled_posts()
-        except Exception as e:
-            logger.error(f"Error in scheduler loop: {e}")
-        await asyncio.sleep(3600) # Check scheduler every hour
+# Background jobs run on the worker thread pool, off the event loop
+worker_manager.register("monitor", check_leads, interval=monitor_interval, timeout=600)
+worker_manager.register("dm_check", check_dms, interval=60, timeout=300) # Check DMs every minute
+worker_manager.register("scheduler", check_scheduled_posts, interval=3600, timeout=300) # Check scheduler every hour
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting up...")
     init_db()
+    db_writer.start()
+    log_sink.start()
+    # Started now rather than on the first notify(), so notifications spilled by an earlier run go out
+    notifier.start()
+    
+    # Index recent lead fingerprints before the first collector request checks for near-duplicates
+    db = SessionLocal()
+    try:
+        duplicate_index.warm_up(db)
+    except Exception as e:
+        logger.error(f"Near-duplicate index warm-up failed: {e}")
+    finally:
+        db.close()
+
+    # Build (or load the snapshot of) the knowledge index before the first DM needs it
+    try:
+        rag_system.warm_up()
+    except Exception as e:
+        logger.error(f"RAG warm-up failed: {e}")
     
     # We are using Devvit for the actual Reddit monitoring and DMs.
     # The Python backend now serves as the Dashboard & Data Collector API only.
     # This prevents the "Credentials not configured" error on Render.
     
-    # logger.info("Background tasks disabled (handled by Devvit)")
-    # asyncio.create_task(background_monitor())
-    # asyncio.create_task(background_dm_check())
-    # asyncio.create_task(background_scheduler())
+    # Set ENABLE_BACKGROUND_JOBS=true to run them from this process instead.
+    if config.get("ENABLE_BACKGROUND_JOBS"):
+        worker_manager.start()
+    else:
+        logger.info("Background tasks disabled (handled by Devvit)")
     
     yield
     
     # Shutdown
     logger.info("Shutting down...")
+    await worker_manager.stop()
+    notifier.stop()
+    log_sink.stop()
+    db_writer.stop()
 
 app = FastAPI(lifespan=lifespan)
 
+app.add_middleware(
+    MetricsMiddleware,
+    histogram=metrics.histogram("http_request_duration_seconds", "HTTP request latency by route, method and status class"),
+)
+
 # CORS configuration: Allow all for easy testing on Render/Vercel
 app.add_middleware(
     CORSMiddleware,
@@ -70,6 +81,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, SYNC_CURSOR_HEADER],
 )
 
 app.include_router(router, prefix="/api")
@@ -0,0 +1,94 @@
+import re
+import threading
+from collections import namedtuple
+from database import Settings
+from utils import get_logger
+
+logger = get_logger(__name__)
+
+KeywordMatch = namedtuple("KeywordMatch", ["keyword", "start", "end"])
+
+class KeywordMatcher:
+    """
+    Matches a whole keyword list against a text in a single regex pass.
+
+    The keywords are compiled once into one alternation (longest first) and
+    only recompiled when the list changes. Rules per keyword:
+    - plain words and phrases match on word boundaries, case-insensitively
+    - whitespace inside a phrase matches any run of whitespace
+    - a '*' after a word lets that word take any suffix, at the end of a
+      keyword ("commission*") or inside a phrase ("work* from home")
+    """
+    def __init__(self, keywords=(), whole_words=True):
+        self.whole_words = whole_words
+        self._lock = threading.Lock()
+        self._state = (tuple(), None, {})
+        self.reload(keywords)
+
+    @property
+    def keywords(self):
+        return list(self._state[0])
+
+    def _compile_keyword(self, keyword):
+        words = [word for word in keyword.split() if word.strip("*")]
+        if not words:
+            return None
+        parts = []
+        for word in words:
+            part = re.escape(word.rstrip("*"))
+            if word.endswith("*") and self.whole_words:
+                part += r"\w*"
+            parts.append(part)
+        body = r"\s+".join(parts)
+        if not self.whole_words:
+            return body
+        head = r"\b" if re.match(r"\w", words[0]) else ""
+        last = words[-1]
+        tail = "" if last.endswith("*") or not re.search(r"\w$", last) else r"\b"
+        return head + body + tail
+
+    def reload(self, keywords):
+        """Recompiles the pattern if the keyword list changed. Returns True if it did."""
+        normalized = tuple(dict.fromkeys(k.strip().lower() for k in keywords if k and k.strip()))
+        with self._lock:
+            if normalized == self._state[0] and self._state[1] is not None:
+                return False
+
+            alternatives = []
+            group_names = {}
+            # Longest first so "sales rep" wins over "sales" at the same position
+            for keyword in sorted(normalized, key=len, reverse=True):
+                pattern = self._compile_keyword(keyword)
+                if pattern is None:
+                    continue
+                name = f"k{len(group_names)}"
+                group_names[name] = keyword
+                alternatives.append(f"(?P<{name}>{pattern})")
+
+            regex = re.compile("|".join(alternatives), re.IGNORECASE) if alternatives else None
+            # Swap in one assignment so concurrent readers see either the old or new state
+            self._state = (normalized, regex, group_names)
+
+        logger.info(f"Keyword matcher compiled with {len(group_names)} keywords.")
+        return True
+
+    def find(self, text):
+        """Returns every non-overlapping keyword match in text, in order."""
+        _, regex, group_names = self._state
+        if regex is None or not text:
+            return []
+        return [KeywordMatch(group_names[m.lastgroup], m.start(), m.end()) for m in regex.finditer(text)]
+
+    def matched_keywords(self, text):
+        return list(dict.fromkeys(match.keyword for match in self.find(text)))
+
+    def matches(self, text):
+        _, regex, _ = self._state
+        return bool(regex and text and regex.search(text))
+
+def load_list_setting(db, key):
+    """Reads a {"list": [...]} setting such as monitored_subreddits or lead_keywords."""
+    setting = db.query(Settings).filter(Settings.key == key).first()
+    if setting and isinstance(setting.value, dict) and setting.value.get("list"):
+        return setting.value["list"]
+    return None
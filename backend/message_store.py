@@ -0,0 +1,70 @@
+from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+from database import Conversation, Message, CONVERSATION_PREVIEW_CHARS, parse_timestamp
+
+def get_or_create_conversation(db, reddit_username):
+    conversation = db.query(Conversation).filter(Conversation.reddit_username == reddit_username).first()
+    if not conversation:
+        conversation = Conversation(reddit_username=reddit_username, status="new")
+        db.add(conversation)
+    return conversation
+
+# Rows per INSERT, well under SQLite's bound-parameter limit
+INSERT_CHUNK_SIZE = 500
+
+def append_messages(db, conversation, items):
+    """
+    Appends {role, content, timestamp?, external_id?} items to a conversation
+    as new rows. Items whose external_id is already stored are skipped by
+    the insert itself, so replaying the same batch, even concurrently, is
+    harmless. Updates the denormalized summary columns in SQL; the caller
+    commits. Returns the inserted rows as dicts, oldest first.
+    """
+    if conversation.id is None:
+        db.flush()
+
+    rows = [
+        {
+            "conversation_id": conversation.id,
+            "role": item["role"],
+            "content": item["content"],
+            "created_at": parse_timestamp(item.get("timestamp")) or datetime.utcnow(),
+            "external_id": item.get("external_id") or None,
+        }
+        for item in items
+    ]
+    added = []
+    for i in range(0, len(rows), INSERT_CHUNK_SIZE):
+        stmt = insert(Message).values(rows[i:i + INSERT_CHUNK_SIZE])
+        stmt = stmt.on_conflict_do_nothing(index_elements=["external_id"]).returning(*Message.__table__.c)
+        added.extend(dict(row._mapping) for row in db.execute(stmt))
+    added.sort(key=lambda row: row["id"])
+
+    if added:
+        # Evaluated by the UPDATE, so concurrent appends can't lose each other's counts
+        conversation.message_count = func.coalesce(Conversation.message_count, 0) + len(added)
+        conversation.last_message_preview = (added[-1]["content"] or "")[:CONVERSATION_PREVIEW_CHARS]
+        # Flushed now: a second append in the same session would otherwise replace the pending expression
+        db.flush()
+        # Core inserts skip the session's after_flush hook, so queue the message events for after commit
+        db.info.setdefault("pending_events", []).extend(("message", row) for row in added)
+    return added
+
+def get_messages(db, conversation_id, limit=50, before=None):
+    """Newest `limit` messages (oldest first), or the ones before message id `before`."""
+    query = db.query(Message).filter(Message.conversation_id == conversation_id)
+    if before is not None:
+        query = query.filter(Message.id < before)
+    rows = query.order_by(Message.id.desc()).limit(limit).all()
+    rows.reverse()
+    return rows
+
+def serialize_message(message):
+    return {
+        "id": message.id,
+        "role": message.role,
+        "content": message.content,
+        "timestamp": message.created_at,
+        "external_id": message.external_id,
+    }
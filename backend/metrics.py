@@ -0,0 +1,235 @@
+import time
+import bisect
+import functools
+import threading
+from contextlib import contextmanager
+
+# Upper bounds in seconds, from a cached lookup up to a slow monitor cycle
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(value)
+
+class Counter:
+    """Monotonic count per label set."""
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in values.items()]
+
+    def summary(self):
+        with self._lock:
+            return [{"labels": dict(key), "value": value} for key, value in self._values.items()]
+
+class _Series:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram per label set, Prometheus style.
+    observe() is a bisect and three additions under a lock, cheap enough
+    for every call on the hot paths.
+    """
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(self.buckets)
+            series.counts[index] += 1
+            series.sum += value
+            series.count += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def timed(self, **labels):
+        """Decorator recording each call's duration, whether it returns or raises."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - started, **labels)
+            return wrapper
+        return decorator
+
+    def _snapshot(self):
+        with self._lock:
+            return {key: (list(series.counts), series.sum, series.count) for key, series in self._series.items()}
+
+    def quantile(self, counts, total, q):
+        """Estimates a quantile from bucket counts by linear interpolation inside the bucket (like histogram_quantile)."""
+        if not total:
+            return None
+        rank = q * total
+        cumulative = 0
+        for i, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                if i == len(self.buckets):
+                    return lower  # in the +Inf bucket: the largest finite bound is all we know
+                upper = self.buckets[i]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def render(self):
+        lines = []
+        for key, (counts, total_sum, total) in self._snapshot().items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', _format_value(float(bound)))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total_sum)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {total}")
+        return lines
+
+    def summary(self):
+        result = []
+        for key, (counts, total_sum, total) in self._snapshot().items():
+            def ms(q):
+                value = self.quantile(counts, total, q)
+                return round(value * 1000, 2) if value is not None else None
+            result.append({
+                "labels": dict(key),
+                "count": total,
+                "mean_ms": round(total_sum / total * 1000, 2) if total else None,
+                "p50_ms": ms(0.5),
+                "p95_ms": ms(0.95),
+                "p99_ms": ms(0.99),
+            })
+        return result
+
+class MetricsRegistry:
+    """In-process counters and histograms, rendered for Prometheus or as a JSON summary."""
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    def _register(self, cls, name, help_text, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, **kwargs)
+            return metric
+
+    def counter(self, name, help_text):
+        return self._register(Counter, name, help_text)
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, help_text, buckets=buckets)
+
+    def render_prometheus(self):
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        lines.append("# HELP process_uptime_seconds Seconds since the metrics registry was created")
+        lines.append("# TYPE process_uptime_seconds gauge")
+        lines.append(f"process_uptime_seconds {time.time() - self.started:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        return {
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "histograms": {m.name: {"help": m.help, "series": m.summary()} for m in list(self._metrics.values()) if m.kind == "histogram"},
+            "counters": {m.name: {"help": m.help, "series": m.summary()} for m in list(self._metrics.values()) if m.kind == "counter"},
+        }
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware timing every HTTP request by route template,
+    method and status class. Cheaper than BaseHTTPMiddleware, and it does
+    not buffer streaming responses such as /events. Event streams stay open
+    for as long as the dashboard does, so for them only the time until the
+    response starts is recorded.
+    """
+    def __init__(self, app, histogram):
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = [500]
+        observed = [False]
+
+        def observe():
+            # Filled in by the router; unmatched paths share one label so they can't explode cardinality
+            route = getattr(scope.get("route"), "path", "unmatched")
+            self.histogram.observe(
+                time.perf_counter() - started,
+                route=route,
+                method=scope["method"],
+                status=f"{status[0] // 100}xx",
+            )
+            observed[0] = True
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                if any(name == b"content-type" and value.startswith(b"text/event-stream") for name, value in message.get("headers", ())):
+                    observe()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            if not observed[0]:
+                observe()
+
+metrics = MetricsRegistry()
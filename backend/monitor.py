@@ -1,12 +1,22 @@
-import praw
 import time
-import requests
-from database import SessionLocal, Lead
-from ai_client import ai_client
-from utils import get_logger, config
+from collections import Counter
+from database import SessionLocal, Lead, Settings
+from db_writer import db_writer
+from lead_scoring import lead_scorer, apply_score
+from notifier import notifier
+from matcher import KeywordMatcher, load_list_setting
+from metrics import metrics
+from near_duplicates import duplicate_index, fingerprint, count_duplicates
+from reddit_client import get_reddit_client
+from seen_posts import SeenPosts
+from utils import get_logger, get_random_interval, config
 
 logger = get_logger(__name__)
 
+job_seconds = metrics.histogram("job_duration_seconds", "Background job run time")
+fetch_seconds = metrics.histogram("reddit_listing_seconds", "Time to read new posts from Reddit per poll")
+posts_total = metrics.counter("monitor_posts_total", "Posts seen by the monitor, by outcome")
+
 SUBREDDITS = [
     "sales", "remote_sales", "freelance_sales", "salesjobs", 
     "sidehustle", "marketing", "entrepreneur", "remote",
@@ -14,37 +24,278 @@ SUBREDDITS = [
 ]
 
 KEYWORDS = [
-    "commission", "sales", "remote work", "freelance", 
-    "side hustle", "earn money", "work from home", "closer", "appointment setter"
+    "commission*", "sales*", "remote work*", "freelance*",
+    "side hustle*", "earn money*", "work* from home", "closer*", "appointment setter*"
 ]
 
-def get_reddit_client():
-    if not config.get("REDDIT_CLIENT_ID"):
-        return None
-    username = config["REDDIT_USERNAME"] or "unknown_user"
-    user_agent = f"web:SalesAutomation:v1.0.0 (by /u/{username})"
-    
-    return praw.Reddit(
-        client_id=config["REDDIT_CLIENT_ID"],
-        client_secret=config["REDDIT_CLIENT_SECRET"],
-        refresh_token=config["REDDIT_REFRESH_TOKEN"],
-        user_agent=user_agent,
-        username=config["REDDIT_USERNAME"]
-    )
-
-def send_discord_notification(lead):
-    webhook_url = config.get("DISCORD_WEBHOOK_URL")
-    if not webhook_url:
-        return
-    
-    data = {
-        "content": f"🚨 **New Lead Detected!**\n**Subreddit:** r/{lead.subreddit}\n**Title:** {lead.title}\n**URL:** {lead.url}\n**Score:** {lead.score}"
-    }
+# Settings key holding the streaming monitor's per-subreddit high-water marks
+MARKS_SETTING = "monitor_marks"
+
+# Compiled once; reloaded from the "lead_keywords" setting when it changes
+keyword_matcher = KeywordMatcher(KEYWORDS)
+
+# Posts already evaluated (matched or not), like the Devvit bot's 7-day seen_post: keys
+seen_posts = SeenPosts(max_entries=config["SEEN_POSTS_MAX_ENTRIES"], ttl=config["SEEN_POSTS_TTL_DAYS"] * 86400)
+
+def refresh_keywords(db):
+    keywords = load_list_setting(db, "lead_keywords")
+    keyword_matcher.reload(keywords or KEYWORDS)
+
+def load_subreddits(db):
+    """The dashboard's monitored_subreddits list (the one the Devvit bot reads), or the defaults."""
+    subreddits = load_list_setting(db, "monitored_subreddits")
+    if not subreddits:
+        return list(SUBREDDITS)
+    names = (name.strip().lower().removeprefix("r/") for name in subreddits)
+    return list(dict.fromkeys(name for name in names if name))
+
+class SubredditStream:
+    """High-water mark and observed post rate of one subreddit's /new listing."""
+    def __init__(self, name, mark=None):
+        self.name = name
+        mark = mark or {}
+        self.last_fullname = mark.get("fullname")
+        self.last_created_utc = mark.get("created_utc")
+        self.pending_mark = None  # moved into place once the leads it covers are committed
+        self.rate = None  # EWMA of new posts per second
+        self.last_polled_at = None
+        self.next_poll_at = 0.0
+        self.polls = 0
+        self.posts = 0
+        self.gaps = 0
+
+    def mark(self):
+        return self.pending_mark or {"fullname": self.last_fullname, "created_utc": self.last_created_utc}
+
+    def status(self):
+        return {
+            "name": self.name,
+            "last_fullname": self.last_fullname,
+            "last_created_utc": self.last_created_utc,
+            "posts_per_hour": round(self.rate * 3600, 2) if self.rate is not None else None,
+            "next_poll_in": round(max(0.0, self.next_poll_at - time.monotonic()), 1),
+            "polls": self.polls,
+            "posts": self.posts,
+            "gaps": self.gaps,
+        }
+
+class StreamingMonitor:
+    """
+    Polls each subreddit's /new listing on its own schedule and pages back
+    until it reaches the newest post seen last time, so a burst of posts
+    between polls is not cut off at one page. A subreddit is polled about
+    as often as it takes to collect `target_posts` new posts, within
+    [min_interval, max_interval] seconds.
+    """
+    def __init__(self, min_interval=60, max_interval=900, target_posts=5, initial_limit=25, max_backfill=1000):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_posts = target_posts
+        self.initial_limit = initial_limit
+        self.max_backfill = max_backfill
+        self.streams = {}
+
+    def sync(self, db, names):
+        """Tracks newly added subreddits (resuming from their saved mark) and drops removed ones."""
+        setting = db.query(Settings).filter(Settings.key == MARKS_SETTING).first()
+        marks = setting.value if setting and isinstance(setting.value, dict) else {}
+        for name in names:
+            if name not in self.streams:
+                self.streams[name] = SubredditStream(name, marks.get(name))
+        for name in list(self.streams):
+            if name not in names:
+                del self.streams[name]
+
+    def due(self):
+        now = time.monotonic()
+        return [stream for stream in self.streams.values() if stream.next_poll_at <= now]
+
+    def next_interval(self):
+        """Seconds until the next subreddit is due."""
+        if not self.streams:
+            return self.min_interval
+        wait = min(stream.next_poll_at for stream in self.streams.values()) - time.monotonic()
+        return max(1, min(self.max_interval, int(wait) + 1))
+
+    def poll_interval(self, stream):
+        if not stream.rate:
+            return self.max_interval
+        return max(self.min_interval, min(self.max_interval, self.target_posts / stream.rate))
+
+    def fetch(self, reddit, stream):
+        """
+        Returns the submissions posted since the stream's mark, newest first.
+        The new mark is held as pending until advance() is called.
+        """
+        first_poll = stream.last_fullname is None
+        submissions = []
+        reached_mark = False
+        for submission in reddit.subreddit(stream.name).new(limit=self.initial_limit if first_poll else self.max_backfill):
+            if not first_poll and (
+                submission.fullname == stream.last_fullname or submission.created_utc < stream.last_created_utc
+            ):
+                reached_mark = True
+                break
+            submissions.append(submission)
+
+        if not first_poll and not reached_mark:
+            stream.gaps += 1
+            logger.warning(f"r/{stream.name}: {len(submissions)} posts since the last poll, older ones may have been missed")
+
+        now = time.monotonic()
+        if first_poll:
+            # Nothing observed yet: estimate the rate from the time span of the first page
+            if len(submissions) > 1:
+                span = submissions[0].created_utc - submissions[-1].created_utc
+                stream.rate = (len(submissions) - 1) / span if span > 0 else None
+        else:
+            observed = len(submissions) / max(1.0, now - stream.last_polled_at) if stream.last_polled_at else None
+            if observed is not None:
+                stream.rate = observed if stream.rate is None else 0.7 * stream.rate + 0.3 * observed
+
+        if submissions:
+            stream.pending_mark = {"fullname": submissions[0].fullname, "created_utc": submissions[0].created_utc}
+        stream.last_polled_at = now
+        stream.next_poll_at = now + self.poll_interval(stream)
+        stream.polls += 1
+        stream.posts += len(submissions)
+        return submissions
+
+    def save_marks(self, db):
+        marks = {name: stream.mark() for name, stream in self.streams.items() if stream.mark()["fullname"]}
+        setting = db.query(Settings).filter(Settings.key == MARKS_SETTING).first()
+        if setting:
+            setting.value = marks
+        else:
+            db.add(Settings(key=MARKS_SETTING, value=marks))
+
+    def advance(self):
+        """Moves every pending mark into place; call once save_marks() has been committed."""
+        for stream in self.streams.values():
+            if stream.pending_mark:
+                stream.last_fullname = stream.pending_mark["fullname"]
+                stream.last_created_utc = stream.pending_mark["created_utc"]
+                stream.pending_mark = None
+
+    def discard(self):
+        """Drops pending marks so the next poll re-reads everything since the committed ones."""
+        for stream in self.streams.values():
+            if stream.pending_mark:
+                stream.pending_mark = None
+                stream.next_poll_at = 0.0
+
+    def status(self):
+        return [stream.status() for stream in self.streams.values()]
+
+stream_monitor = StreamingMonitor(
+    min_interval=config["MONITOR_STREAM_MIN_INTERVAL"],
+    max_interval=config["MONITOR_STREAM_MAX_INTERVAL"],
+    target_posts=config["MONITOR_STREAM_TARGET_POSTS"],
+    max_backfill=config["MONITOR_STREAM_MAX_BACKFILL"],
+)
+
+def monitor_interval():
+    """Seconds until the monitor job runs again."""
+    if config["MONITOR_STREAMING"]:
+        return stream_monitor.next_interval()
+    return get_random_interval()
+
+def lead_alert(lead):
+    return f"🚨 **New Lead Detected!**\n**Subreddit:** r/{lead.subreddit}\n**Title:** {lead.title}\n**URL:** {lead.url}\n**Score:** {lead.score}"
+
+def process_submissions(db, submissions):
+    """
+    Builds scored leads for the keyword-matching submissions not stored yet.
+    Near-duplicates of a recent lead (or of an earlier post in the listing)
+    are not scored: they get the canonical lead's score and its reddit_id in
+    duplicate_of. Returns (new leads, ids of every submission evaluated, ids
+    claimed in the near-duplicate index); the caller writes the leads, marks
+    the ids as seen once they are committed and releases the claimed ids if
+    the write fails.
+    """
+    # Bloom filter hits are "maybe seen": evaluated again, and matches are confirmed against the leads table below
+    unseen, maybe_seen = seen_posts.check([submission.id for submission in submissions])
+    unseen = set(unseen)
+    evaluated = []
+    matches = []
+    for submission in submissions:
+        if submission.id not in unseen:
+            continue
+        unseen.discard(submission.id)
+        evaluated.append(submission.id)
+
+        # Keyword Matching (single compiled pass, case-insensitive)
+        full_text = submission.title + "\n" + submission.selftext
+        matched = keyword_matcher.matched_keywords(full_text)
+        if matched:
+            matches.append((submission, matched))
+
+    # Only matching posts need the database: they may have been stored by the Devvit collector
+    existing = set()
+    if matches:
+        ids = [submission.id for submission, _ in matches]
+        existing = {row[0] for row in db.query(Lead.reddit_id).filter(Lead.reddit_id.in_(ids))}
+
+    candidates = []
+    for submission, matched in matches:
+        if submission.id not in existing:
+            logger.info(f"New lead found: {submission.title} (matched: {', '.join(matched)})")
+            candidates.append(submission)
+
+    false_positives = sum(1 for submission in candidates if submission.id in maybe_seen)
+    if false_positives:
+        seen_posts.record_false_positives(false_positives)
+        logger.warning(f"{false_positives} new posts were Bloom filter false positives in the seen-post set")
+
+    if not candidates:
+        return [], evaluated, set()
+
+    # Cross-posts of the same ad are grouped under the first copy. Claimed, so a
+    # collector request carrying the same ad during scoring is grouped under it too
+    fingerprints = {submission.id: fingerprint(submission.title, submission.selftext) for submission in candidates}
+    canonicals, claimed = duplicate_index.claim([(submission.id, fingerprints[submission.id]) for submission in candidates])
+    for submission in candidates:
+        if submission.id in canonicals:
+            logger.info(f"{submission.id} is a near-duplicate of lead {canonicals[submission.id]}, not scoring it")
+
     try:
-        requests.post(webhook_url, json=data)
-    except Exception as e:
-        logger.error(f"Failed to send Discord notification: {e}")
+        # AI Scoring for the whole listing in as few LLM calls as possible
+        to_score = [submission for submission in candidates if submission.id not in canonicals]
+        scores = lead_scorer.score_posts([
+            {"id": submission.id, "title": submission.title, "body": submission.selftext}
+            for submission in to_score
+        ]) if to_score else {}
+
+        # Duplicates of leads stored earlier reuse their stored score
+        stored = set(canonicals.values()) - set(fingerprints)
+        if stored:
+            for lead in db.query(Lead).filter(Lead.reddit_id.in_(stored), Lead.scored_at.isnot(None)):
+                scores[lead.reddit_id] = {"score": lead.score, "intent": lead.intent, "reasoning": lead.reasoning}
+    except Exception:
+        duplicate_index.release(claimed)
+        raise
 
+    new_leads = []
+    for submission in candidates:
+        canonical = canonicals.get(submission.id)
+        new_lead = Lead(
+            reddit_id=submission.id,
+            title=submission.title,
+            body=submission.selftext,
+            subreddit=submission.subreddit.display_name,
+            url=submission.url,
+            author=str(submission.author),
+            status="new",
+            fingerprint=fingerprints[submission.id],
+            duplicate_of=canonical,
+        )
+        score = scores.get(canonical or submission.id)
+        if score:
+            apply_score(new_lead, score)
+        new_leads.append(new_lead)
+    return new_leads, evaluated, claimed
+
+@job_seconds.timed(job="check_leads")
 def check_leads():
     logger.info("Checking for new leads...")
     reddit = get_reddit_client()
@@ -54,48 +305,62 @@ def check_leads():
 
     db = SessionLocal()
     try:
-        # Combine subreddits into a multi-reddit string
-        sub_string = "+".join(SUBREDDITS)
-        # Verify read_only mode or not, usually read_only is fine for reading
-        # But we authenticated with refresh token, so we are authenticated user
-        
-        for submission in reddit.subreddit(sub_string).new(limit=20):
-            # Check if exists
-            exists = db.query(Lead).filter(Lead.reddit_id == submission.id).first()
-            if exists:
-                continue
-
-            # Basic Keyword Matching
-            title_text = submission.title.lower()
-            body_text = submission.selftext.lower()
-            full_text = title_text + " " + body_text
-            
-            flagged = any(keyword in full_text for keyword in KEYWORDS)
-            
-            if flagged:
-                logger.info(f"New lead found: {submission.title}")
-                
-                # AI Scoring
-                # analysis = ai_client.score_lead(submission.title, submission.selftext)
-                # simple score for now
-                score = 80 # Placeholder
-                
-                new_lead = Lead(
-                    reddit_id=submission.id,
-                    title=submission.title,
-                    body=submission.selftext,
-                    subreddit=submission.subreddit.display_name,
-                    url=submission.url,
-                    author=str(submission.author),
-                    score=score,
-                    status="new"
-                )
-                db.add(new_lead)
-                db.commit()
-                
-                send_discord_notification(new_lead)
+        refresh_keywords(db)
+        subreddits = load_subreddits(db)
+        if not seen_posts.warmed:
+            seen_posts.warm_up(db)
+        if not duplicate_index.warmed:
+            duplicate_index.warm_up(db)
+
+        if config["MONITOR_STREAMING"]:
+            stream_monitor.sync(db, subreddits)
+            submissions = []
+            for stream in stream_monitor.due():
+                try:
+                    with fetch_seconds.time():
+                        submissions.extend(stream_monitor.fetch(reddit, stream))
+                except Exception as e:
+                    logger.error(f"Error reading r/{stream.name}: {e}")
+            new_leads, evaluated, claimed = process_submissions(db, submissions)
+        else:
+            # Combine subreddits into a multi-reddit string
+            sub_string = "+".join(subreddits)
+            with fetch_seconds.time():
+                submissions = list(reddit.subreddit(sub_string).new(limit=20))
+            new_leads, evaluated, claimed = process_submissions(db, submissions)
+        # Read now: the writer's commit expires the lead objects. Duplicates don't alert again
+        alerts = [lead_alert(new_lead) for new_lead in new_leads if not new_lead.duplicate_of]
+        duplicates = Counter(lead.duplicate_of for lead in new_leads if lead.duplicate_of)
+
+        def write(session):
+            session.add_all(new_leads)
+            if duplicates:
+                session.flush()
+                count_duplicates(session, duplicates)
+            if config["MONITOR_STREAMING"]:
+                # Committed together with the leads, so a failed run resumes from the old marks
+                stream_monitor.save_marks(session)
+
+        # Through the single writer: upgrading this long read transaction to a write
+        # fails with "database is locked" whenever the writer committed in between
+        try:
+            db_writer.run(write)
+        except Exception:
+            duplicate_index.release(claimed)
+            raise
+        stream_monitor.advance()
+        seen_posts.add(evaluated)
+        posts_total.inc(len(submissions) - len(evaluated), outcome="skipped_seen")
+        posts_total.inc(len(evaluated) - len(new_leads), outcome="no_lead")
+        posts_total.inc(len(new_leads) - sum(duplicates.values()), outcome="lead")
+        posts_total.inc(sum(duplicates.values()), outcome="duplicate")
+
+        # Queued; the notifier sends them (batched with others) off this thread
+        for alert in alerts:
+            notifier.notify(alert)
 
     except Exception as e:
+        stream_monitor.discard()
         logger.error(f"Error checking leads: {e}")
     finally:
         db.close()
@@ -0,0 +1,234 @@
+import re
+import time
+import struct
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from database import Lead
+from utils import get_logger, config
+
+logger = get_logger(__name__)
+
+URL_RE = re.compile(r"https?://\S+|www\.\S+")
+TOKEN_RE = re.compile(r"\w+")
+
+# MinHash signature: NUM_HASHES 16-bit minimums, hex-encoded in Lead.fingerprint
+NUM_HASHES = 64
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+FINGERPRINT_LENGTH = NUM_HASHES * 4
+MASK = (1 << 64) - 1
+# Fewer words than this can't tell a cross-post from a different short post
+MIN_TOKENS = 5
+# Long bodies add little once the first few hundred words agree
+MAX_TOKENS = 1000
+
+def _hash(feature):
+    # A stable hash: Python's hash() is salted per process, fingerprints are stored
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+
+# Multiply-shift permutations of the 64-bit feature hashes, fixed so stored signatures stay comparable
+PERMUTATIONS = [(_hash(f"minhash-a-{i}") | 1, _hash(f"minhash-b-{i}")) for i in range(NUM_HASHES)]
+
+def normalize(title, body):
+    """Lowercased word tokens of title + body, with URLs dropped (cross-posts often differ only in tracking links)."""
+    text = URL_RE.sub(" ", f"{title or ''}\n{body or ''}".lower())
+    return TOKEN_RE.findall(text)[:MAX_TOKENS]
+
+def features(tokens):
+    """Words and adjacent word pairs: a one-word edit changes only three of them, so short posts stay similar."""
+    return set(tokens) | {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+
+def minhash(tokens):
+    """
+    MinHash signature of the token features: for each of NUM_HASHES fixed
+    permutations, the top 16 bits of the smallest permuted feature hash.
+    The share of equal slots between two signatures estimates the Jaccard
+    similarity of their feature sets. Returns None below MIN_TOKENS.
+    """
+    if len(tokens) < MIN_TOKENS:
+        return None
+    hashes = [_hash(feature) for feature in features(tokens)]
+    return struct.pack(f">{NUM_HASHES}H", *(min((a * x + b) & MASK for x in hashes) >> 48 for a, b in PERMUTATIONS))
+
+def fingerprint(title, body):
+    """Hex MinHash signature of a post's normalized title and body, as stored in Lead.fingerprint."""
+    signature = minhash(normalize(title, body))
+    return signature.hex() if signature is not None else None
+
+def _decode(fp):
+    # Rows fingerprinted with another scheme are re-fingerprinted by warm_up()
+    if not fp or len(fp) != FINGERPRINT_LENGTH:
+        return None
+    return bytes.fromhex(fp)
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two signatures (bytes from minhash())."""
+    return sum(x == y for x, y in zip(memoryview(a).cast("H"), memoryview(b).cast("H"))) / NUM_HASHES
+
+class NearDuplicateIndex:
+    """
+    MinHash signatures of recent canonical leads, bucketed for sub-linear
+    lookup (LSH banding). The signature is cut into BANDS bands of ROWS
+    slots; a lead is only compared with the leads sharing at least one band
+    exactly. Two posts with Jaccard similarity s share a band with
+    probability 1 - (1 - s^ROWS)^BANDS: about 99% at s = 0.7 and 99.98% at
+    s = 0.8, below where a one-word edit or an appended line leaves a 30-word
+    ad. Candidates are kept when their estimated similarity reaches
+    `threshold`. Entries expire after `ttl` seconds or once `max_entries` is
+    exceeded. With `enabled` off, claim() finds nothing and every lead
+    stands alone.
+    """
+    def __init__(self, threshold=0.7, max_entries=20000, ttl=7 * 86400, enabled=True):
+        self.enabled = enabled
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # reddit_id -> (signature, expiry), oldest first
+        self._buckets = [{} for _ in range(BANDS)]  # band bytes -> set of reddit_ids
+        self._lock = threading.Lock()
+        self.warmed = False
+        self.lookups = 0
+        self.matches = 0
+
+    def _keys(self, signature):
+        width = ROWS * 2
+        return [signature[i * width:(i + 1) * width] for i in range(BANDS)]
+
+    def _remove(self, reddit_id):
+        signature, _ = self._entries.pop(reddit_id)
+        for buckets, key in zip(self._buckets, self._keys(signature)):
+            bucket = buckets.get(key)
+            if bucket is not None:
+                bucket.discard(reddit_id)
+                if not bucket:
+                    del buckets[key]
+
+    def _expire(self, now):
+        while self._entries:
+            reddit_id, (_, expiry) = next(iter(self._entries.items()))
+            if expiry > now and len(self._entries) <= self.max_entries:
+                break
+            self._remove(reddit_id)
+
+    def _find(self, signature, now, exclude=None):
+        best, best_similarity = None, self.threshold
+        candidates = set()
+        for buckets, key in zip(self._buckets, self._keys(signature)):
+            candidates.update(buckets.get(key, ()))
+        candidates.discard(exclude)
+        for reddit_id in candidates:
+            other, expiry = self._entries[reddit_id]
+            if expiry <= now:
+                continue
+            score = similarity(signature, other)
+            if score >= best_similarity and (best is None or score > best_similarity):
+                best, best_similarity = reddit_id, score
+        return best
+
+    def _add(self, reddit_id, signature, now):
+        if reddit_id in self._entries:
+            self._remove(reddit_id)
+        self._entries[reddit_id] = (signature, now + self.ttl)
+        for buckets, key in zip(self._buckets, self._keys(signature)):
+            buckets.setdefault(key, set()).add(reddit_id)
+        self._expire(now)
+
+    def find(self, fingerprint):
+        """The reddit_id of the most similar indexed lead at or above the threshold, or None."""
+        signature = _decode(fingerprint)
+        if signature is None:
+            return None
+        with self._lock:
+            return self._find(signature, time.monotonic())
+
+    def add(self, reddit_id, fingerprint):
+        signature = _decode(fingerprint)
+        if signature is None:
+            return
+        with self._lock:
+            self._add(reddit_id, signature, time.monotonic())
+
+    def claim(self, items):
+        """
+        items: (reddit_id, fingerprint) pairs in arrival order. Returns
+        (canonicals, claimed): canonicals maps every item that is a near
+        duplicate of an indexed lead or of an earlier item to that lead's
+        reddit_id; claimed is the ids of the other items, which are indexed
+        in the same locked step so a concurrent claim of the same ad finds
+        them. Callers release() the claimed ids they end up not storing.
+        """
+        canonicals, claimed = {}, set()
+        if not self.enabled:
+            return canonicals, claimed
+        now = time.monotonic()
+        with self._lock:
+            for reddit_id, fp in items:
+                signature = _decode(fp)
+                if signature is None:
+                    continue
+                self.lookups += 1
+                canonical = self._find(signature, now, exclude=reddit_id)
+                if canonical:
+                    self.matches += 1
+                    canonicals[reddit_id] = canonical
+                elif reddit_id not in self._entries:
+                    # Already indexed ids (a resubmitted lead) were claimed by whoever stored them
+                    self._add(reddit_id, signature, now)
+                    claimed.add(reddit_id)
+        return canonicals, claimed
+
+    def release(self, reddit_ids):
+        """Drops claimed ids whose leads were not stored."""
+        with self._lock:
+            for reddit_id in reddit_ids:
+                if reddit_id in self._entries:
+                    self._remove(reddit_id)
+
+    def warm_up(self, db):
+        """Indexes the canonical leads stored within the ttl window, fingerprinting rows that have no usable signature."""
+        since = datetime.utcnow() - timedelta(seconds=self.ttl)
+        rows = (
+            db.query(Lead.reddit_id, Lead.fingerprint, Lead.title, Lead.body)
+            .filter(Lead.created_at >= since, Lead.duplicate_of.is_(None))
+            .order_by(Lead.created_at.desc())
+            .limit(self.max_entries)
+            .all()
+        )
+        # Oldest first, so the newest are the last to expire
+        for reddit_id, fp, title, body in reversed(rows):
+            self.add(reddit_id, fp if _decode(fp) is not None else fingerprint(title, body))
+        self.warmed = True
+        logger.info(f"Near-duplicate index warmed with {len(rows)} recent leads")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "threshold": self.threshold,
+                "bands": BANDS,
+                "rows": ROWS,
+                "lookups": self.lookups,
+                "matches": self.matches,
+                "warmed": self.warmed,
+            }
+
+def count_duplicates(db, counts):
+    """
+    Adds {canonical reddit_id: new duplicates} to the canonical leads'
+    duplicate_count. Loaded through the ORM so the change is version
+    stamped for the change feeds; flush first if the canonicals are pending.
+    """
+    if not counts:
+        return
+    for lead in db.query(Lead).filter(Lead.reddit_id.in_(list(counts))):
+        lead.duplicate_count = (lead.duplicate_count or 0) + counts[lead.reddit_id]
+
+duplicate_index = NearDuplicateIndex(
+    threshold=config["NEAR_DUPLICATE_SIMILARITY"],
+    max_entries=config["NEAR_DUPLICATE_MAX_ENTRIES"],
+    ttl=config["NEAR_DUPLICATE_TTL_DAYS"] * 86400,
+    enabled=config["NEAR_DUPLICATES"],
+)
@@ -0,0 +1,275 @@
+import time
+import queue
+import threading
+import requests
+from sqlalchemy import delete, update
+from database import SessionLocal, PendingNotification
+from db_writer import db_writer
+from utils import get_logger, config
+
+logger = get_logger(__name__)
+
+# Discord rejects message content longer than this
+MAX_CONTENT_CHARS = 2000
+SEPARATOR = "\n\n"
+
+_STOP = object()
+
+def pack_messages(contents, limit=MAX_CONTENT_CHARS):
+    """
+    Joins notifications into as few messages of at most `limit` characters
+    as possible. Returns (message, number of notifications in it) pairs.
+    """
+    messages = []
+    current, count = "", 0
+    for content in contents:
+        content = content if len(content) <= limit else content[:limit - 1] + "…"
+        if current and len(current) + len(SEPARATOR) + len(content) <= limit:
+            current += SEPARATOR + content
+            count += 1
+        else:
+            if current:
+                messages.append((current, count))
+            current, count = content, 1
+    if current:
+        messages.append((current, count))
+    return messages
+
+class Notifier:
+    """
+    Delivers Discord webhook notifications from a background thread so lead
+    detection and DM replies never wait on the webhook. Notifications that
+    arrive within `coalesce_window` seconds of each other are sent as one
+    message per webhook. 429s are retried after Retry-After, and a webhook's
+    bucket is left alone until it resets once X-RateLimit-Remaining hits 0.
+    When the queue is full, or delivery keeps failing, notifications are
+    spilled to the pending_notifications table and retried later.
+    """
+    def __init__(self, max_queue=500, coalesce_window=2.0, max_batch=50, timeout=10, max_retries=4,
+                 retry_interval=60, max_attempts=10):
+        self.coalesce_window = coalesce_window
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_interval = retry_interval
+        self.max_attempts = max_attempts
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._session = requests.Session()
+        self._blocked_until = {}  # webhook url -> monotonic time its rate limit bucket resets
+        self._thread = None
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.sent = 0
+        self.messages = 0
+        self.throttled = 0
+        self.spilled = 0
+        self.failed = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="notifier", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=15):
+        """Sends (or spills) whatever is still queued, then stops the sender thread."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def notify(self, content, webhook_url=None):
+        """Queues a notification without blocking. Does nothing if no webhook is configured."""
+        webhook_url = webhook_url or config.get("DISCORD_WEBHOOK_URL")
+        if not webhook_url:
+            return
+        self.start()
+        try:
+            self._queue.put_nowait((webhook_url, content))
+            self.queued += 1
+        except queue.Full:
+            self._spill([(webhook_url, content)])
+
+    def _spill(self, items):
+        rows = [{"webhook_url": url, "content": content} for url, content in items]
+
+        def write(db):
+            db.add_all(PendingNotification(**row) for row in rows)
+
+        # Not waited on: the caller may be on the lead or DM path
+        db_writer.submit(write)
+        self.spilled += len(rows)
+        logger.warning(f"Spilled {len(rows)} notifications to the database")
+
+    def _loop(self):
+        next_retry = time.monotonic()
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.1, next_retry - time.monotonic()))
+            except queue.Empty:
+                item = None
+
+            stopping = item is _STOP
+            batch = [item] if item is not None and not stopping else []
+            deadline = time.monotonic() + self.coalesce_window
+            while batch and len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            if stopping:
+                # Drain without waiting for more
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not _STOP:
+                        batch.append(item)
+
+            if batch:
+                failed = self._dispatch(batch)
+                if failed:
+                    self._spill(failed)
+            if stopping:
+                return
+            if time.monotonic() >= next_retry:
+                try:
+                    self._retry_spilled()
+                except Exception as e:
+                    logger.error(f"Retrying spilled notifications failed: {e}")
+                next_retry = time.monotonic() + self.retry_interval
+
+    def _dispatch(self, items):
+        """Sends items grouped per webhook. Returns the items that could not be delivered."""
+        by_url = {}
+        for url, content in items:
+            by_url.setdefault(url, []).append(content)
+
+        failed = []
+        for url, contents in by_url.items():
+            for message, count in pack_messages(contents):
+                if failed and failed[-1][0] == url:
+                    # This webhook is failing; don't hammer it with the rest of the batch
+                    failed.append((url, message))
+                    continue
+                if self._post(url, message):
+                    self.messages += 1
+                    self.sent += count
+                else:
+                    failed.append((url, message))
+        return failed
+
+    def _post(self, url, content):
+        """Returns True once Discord accepted (or permanently rejected) the message, False to keep it for later."""
+        delay = 1.0
+        for attempt in range(self.max_retries + 1):
+            wait = self._blocked_until.get(url, 0) - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                response = self._session.post(url, json={"content": content}, timeout=self.timeout)
+            except requests.RequestException as e:
+                logger.error(f"Discord webhook request failed: {e}")
+            else:
+                self._update_bucket(url, response.headers)
+                if response.status_code == 429:
+                    self.throttled += 1
+                    delay = self._retry_after(response)
+                    logger.warning(f"Discord webhook rate limited, retrying in {delay:.1f}s")
+                    time.sleep(delay)
+                    continue
+                if response.ok:
+                    return True
+                if response.status_code < 500:
+                    self.failed += 1
+                    logger.error(f"Discord rejected notification ({response.status_code}): {response.text[:200]}")
+                    return True
+                logger.error(f"Discord webhook returned {response.status_code}")
+            if attempt < self.max_retries:
+                time.sleep(delay)
+                delay = min(delay * 2, 30)
+        return False
+
+    def _update_bucket(self, url, headers):
+        if headers.get("X-RateLimit-Remaining") == "0":
+            try:
+                reset_after = float(headers.get("X-RateLimit-Reset-After", "1"))
+            except ValueError:
+                reset_after = 1.0
+            self._blocked_until[url] = time.monotonic() + reset_after
+
+    @staticmethod
+    def _retry_after(response):
+        try:
+            return float(response.json().get("retry_after"))
+        except (ValueError, TypeError, AttributeError):
+            pass
+        try:
+            return float(response.headers.get("Retry-After", "1"))
+        except ValueError:
+            return 1.0
+
+    def _retry_spilled(self, limit=100):
+        db = SessionLocal()
+        try:
+            rows = db.query(PendingNotification).order_by(PendingNotification.id.asc()).limit(limit).all()
+            pending = [(row.id, row.webhook_url, row.content, row.attempts) for row in rows]
+        finally:
+            db.close()
+        if not pending:
+            return
+
+        delivered, retried, dropped = [], [], []
+        by_url = {}
+        for row_id, url, content, attempts in pending:
+            by_url.setdefault(url, []).append((row_id, content, attempts))
+        for url, entries in by_url.items():
+            # pack_messages keeps the order, so each message covers the next `count` entries
+            start = 0
+            for message, count in pack_messages([content for _, content, _ in entries]):
+                covered = entries[start:start + count]
+                start += count
+                if self._post(url, message):
+                    delivered.extend(row_id for row_id, _, _ in covered)
+                    continue
+                # This webhook is failing: the rest of its rows wait for the next round untouched
+                for row_id, _, attempts in covered:
+                    (dropped if attempts + 1 >= self.max_attempts else retried).append(row_id)
+                break
+
+        def write(db):
+            if delivered or dropped:
+                db.execute(delete(PendingNotification).where(PendingNotification.id.in_(delivered + dropped)))
+            if retried:
+                db.execute(update(PendingNotification).where(PendingNotification.id.in_(retried))
+                           .values(attempts=PendingNotification.attempts + 1))
+
+        db_writer.run(write)
+        self.sent += len(delivered)
+        self.failed += len(dropped)
+        if delivered:
+            logger.info(f"Delivered {len(delivered)} spilled notifications")
+        if dropped:
+            logger.error(f"Dropped {len(dropped)} notifications after {self.max_attempts} failed attempts")
+
+    def stats(self):
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "queued_now": self._queue.qsize(),
+            "queued": self.queued,
+            "sent": self.sent,
+            "messages": self.messages,
+            "throttled": self.throttled,
+            "spilled": self.spilled,
+            "failed": self.failed,
+        }
+
+notifier = Notifier(max_queue=config["NOTIFY_QUEUE_SIZE"], coalesce_window=config["NOTIFY_COALESCE_SECONDS"])
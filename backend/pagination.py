@@ -0,0 +1,102 @@
+import base64
+import hashlib
+from datetime import datetime
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_
+
+# Response header carrying the cursor of the next (older) page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Response header carrying the change-feed cursor a list response is current as of
+SYNC_CURSOR_HEADER = "X-Sync-Cursor"
+# Largest page a list or change-feed request can ask for
+MAX_PAGE_SIZE = 500
+
+def page_size(limit):
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+def encode_cursor(timestamp, row_id):
+    raw = f"{timestamp.isoformat() if timestamp else ''}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        timestamp, row_id = raw.rsplit("|", 1)
+        return (datetime.fromisoformat(timestamp) if timestamp else None), int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def keyset_page(query, timestamp_column, id_column, cursor=None, limit=100, response=None, skip=0):
+    """
+    Newest-first keyset pagination on (timestamp, id). Only rows strictly
+    after the cursor are read, so deep pages cost the same as the first one
+    when a matching (timestamp, id) index exists. Sets X-Next-Cursor on the
+    response when another page may follow. `skip` is the legacy offset,
+    counted from the cursor when both are given.
+    """
+    limit = page_size(limit)
+    if cursor:
+        timestamp, row_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            timestamp_column < timestamp,
+            and_(timestamp_column == timestamp, id_column < row_id),
+        ))
+
+    query = query.order_by(timestamp_column.desc(), id_column.desc()).limit(limit)
+    if skip > 0:
+        # Applied last: filter() refuses a query that already has an OFFSET
+        query = query.offset(skip)
+    rows = query.all()
+    if response is not None and len(rows) == limit:
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            getattr(last, timestamp_column.key), getattr(last, id_column.key)
+        )
+    return rows
+
+def parse_change_cursor(since):
+    if not since:
+        return 0, 0
+    try:
+        version, row_id = since.split(".", 1)
+        return int(version), int(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def change_page(query, version_column, id_column, since=None, limit=100):
+    """
+    Rows written after the `since` cursor, oldest change first. Pass the
+    returned cursor back as `since` to get only what changed in between.
+    """
+    version, row_id = parse_change_cursor(since)
+    limit = page_size(limit)
+    rows = query.filter(or_(
+        version_column > version,
+        and_(version_column == version, id_column > row_id),
+    )).order_by(version_column.asc(), id_column.asc()).limit(limit).all()
+
+    if rows:
+        last = rows[-1]
+        cursor = f"{getattr(last, version_column.key)}.{getattr(last, id_column.key)}"
+    else:
+        cursor = f"{version}.{row_id}"
+    return {"items": rows, "cursor": cursor, "has_more": len(rows) == limit}
+
+def sync_cursor(db, version_column, id_column):
+    """Change-feed cursor of the most recent write; it changes whenever a row is written."""
+    row = db.query(version_column, id_column).order_by(version_column.desc(), id_column.desc()).first()
+    return f"{row[0]}.{row[1]}" if row else "0.0"
+
+def check_etag(request, response, *parts):
+    """
+    Sets an ETag derived from parts plus the query string. Returns a 304
+    response to send instead of the body if the client already has it.
+    """
+    raw = repr(parts + (str(request.url.query),)).encode("utf-8")
+    etag = f'W/"{hashlib.sha1(raw).hexdigest()[:20]}"'
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    return None
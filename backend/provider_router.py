@@ -0,0 +1,241 @@
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from metrics import metrics
+from utils import get_logger
+
+logger = get_logger(__name__)
+
+request_seconds = metrics.histogram("llm_request_seconds", "LLM provider call latency by provider and outcome")
+timeouts_total = metrics.counter("llm_timeouts_total", "LLM provider calls given up on after the router timeout")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class ProviderHealth:
+    """
+    Rolling latency/error statistics and circuit breaker state for one LLM
+    provider. The breaker opens after `failure_threshold` consecutive
+    failures, lets a single trial call through after `cooldown` seconds and
+    closes again on the first success.
+    """
+    def __init__(self, name, failure_threshold=3, cooldown=60, window=50):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.consecutive_failures = 0
+        self.outcomes = deque(maxlen=window)  # True for success
+        self.latencies = deque(maxlen=window)  # successful calls only
+        self.ewma_latency = None
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.served = 0
+        self.last_error = None
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Returns True if a call may be sent to this provider now."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+                self.trial_in_flight = False
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self, latency):
+        with self._lock:
+            self.requests += 1
+            self.successes += 1
+            self.outcomes.append(True)
+            self.latencies.append(latency)
+            self.ewma_latency = latency if self.ewma_latency is None else 0.8 * self.ewma_latency + 0.2 * latency
+            self.consecutive_failures = 0
+            if self.state != CLOSED:
+                logger.info(f"Circuit for {self.name} closed")
+            self.state = CLOSED
+            self.trial_in_flight = False
+
+    def record_failure(self, error, timed_out=False):
+        with self._lock:
+            self.requests += 1
+            self.failures += 1
+            if timed_out:
+                self.timeouts += 1
+            self.outcomes.append(False)
+            self.last_error = str(error)
+            self.consecutive_failures += 1
+            self.trial_in_flight = False
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logger.warning(f"Circuit for {self.name} opened after {self.consecutive_failures} failures")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    @property
+    def error_rate(self):
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def percentile(self, pct):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def routing_cost(self):
+        """Smoothed latency inflated by the error rate, or None before the first successful call."""
+        if self.ewma_latency is None:
+            return None
+        return self.ewma_latency * (1 + 2 * self.error_rate)
+
+    def stats(self):
+        p50 = self.percentile(50)
+        p95 = self.percentile(95)
+        return {
+            "name": self.name,
+            "state": self.state,
+            "requests": self.requests,
+            "successes": self.successes,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "served": self.served,
+            "error_rate": round(self.error_rate, 4),
+            "ewma_latency": round(self.ewma_latency, 3) if self.ewma_latency is not None else None,
+            "p50_latency": round(p50, 3) if p50 is not None else None,
+            "p95_latency": round(p95, 3) if p95 is not None else None,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error,
+        }
+
+class _Attempt:
+    def __init__(self, provider):
+        self.provider = provider
+        self.future = None
+        self.started = time.monotonic()
+        self.abandoned = False
+
+class ProviderRouter:
+    """
+    Sends a prompt to the healthiest/fastest available provider, falls back
+    to the next one on failure or timeout and, when hedging is enabled,
+    also fires the next provider if the first hasn't answered within its
+    p95 latency.
+    """
+    def __init__(self, timeout=20, hedge=False, hedge_min_delay=2.0, failure_threshold=3, cooldown=60, max_workers=8):
+        self.timeout = timeout
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.providers = []  # (name, func, health) in priority order
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
+        self._lock = threading.Lock()
+
+    def add(self, name, func):
+        health = ProviderHealth(name, self.failure_threshold, self.cooldown)
+        self.providers.append((name, func, health))
+        return health
+
+    def ordered(self):
+        costs = [health.routing_cost() for _, _, health in self.providers]
+        if None in costs:
+            # Configured priority decides until every provider has stats: an untried
+            # fallback must not look free and take over from a measured primary
+            return list(self.providers)
+        ranked = sorted(range(len(self.providers)), key=lambda i: (costs[i], i))
+        return [self.providers[i] for i in ranked]
+
+    def _run(self, attempt, prompt):
+        # Runs on a pool thread; the outcome is recorded unless the caller already gave up on it
+        name, func, health = attempt.provider
+        started = time.monotonic()
+        try:
+            result = func(prompt)
+            error = None
+        except Exception as e:
+            result = None
+            error = e
+        latency = time.monotonic() - started
+        # Recorded even for abandoned calls: this is how long the provider really took
+        request_seconds.observe(latency, provider=name, outcome="ok" if error is None else "error")
+        with self._lock:
+            if attempt.abandoned:
+                return False, None
+        if error is None:
+            health.record_success(latency)
+        else:
+            logger.error(f"{name} API failed: {error}")
+            health.record_failure(error)
+        return error is None, result
+
+    def _launch(self, provider, prompt):
+        attempt = _Attempt(provider)
+        attempt.future = self._executor.submit(self._run, attempt, prompt)
+        return attempt
+
+    def hedge_delay(self, health):
+        p95 = health.percentile(95) if len(health.latencies) >= 5 else None
+        return max(self.hedge_min_delay, p95 or 0.0)
+
+    def call(self, prompt):
+        """Returns (provider name, text), or (None, None) if every provider failed."""
+        candidates = iter(self.ordered())
+        in_flight = []
+        last_launch = 0.0
+
+        def launch_next():
+            for provider in candidates:
+                if provider[2].acquire():
+                    in_flight.append(self._launch(provider, prompt))
+                    return True
+            return False
+
+        exhausted = not launch_next()
+        last_launch = time.monotonic()
+        while in_flight:
+            now = time.monotonic()
+            wake = min(attempt.started + self.timeout for attempt in in_flight)
+            can_hedge = self.hedge and not exhausted and len(in_flight) == 1
+            if can_hedge:
+                wake = min(wake, last_launch + self.hedge_delay(in_flight[0].provider[2]))
+
+            done, _ = wait([attempt.future for attempt in in_flight], timeout=max(0.0, wake - now), return_when=FIRST_COMPLETED)
+            for attempt in [a for a in in_flight if a.future in done]:
+                in_flight.remove(attempt)
+                ok, result = attempt.future.result()
+                if ok:
+                    attempt.provider[2].served += 1
+                    return attempt.provider[0], result
+
+            now = time.monotonic()
+            for attempt in [a for a in in_flight if now >= a.started + self.timeout]:
+                with self._lock:
+                    attempt.abandoned = True
+                in_flight.remove(attempt)
+                logger.error(f"{attempt.provider[0]} API timed out after {self.timeout}s")
+                attempt.provider[2].record_failure(f"Timed out after {self.timeout}s", timed_out=True)
+                timeouts_total.inc(provider=attempt.provider[0])
+
+            if not in_flight or (can_hedge and now >= last_launch + self.hedge_delay(in_flight[0].provider[2])):
+                if not exhausted:
+                    if in_flight:
+                        logger.info(f"Hedging {in_flight[0].provider[0]} request")
+                    exhausted = not launch_next()
+                    last_launch = time.monotonic()
+
+        return None, None
+
+    def stats(self):
+        return [health.stats() for _, _, health in self.providers]
@@ -1,66 +1,237 @@
 import os
+import re
 import glob
-from utils import get_logger
+import json
+import math
+import time
+import heapq
+import threading
+from collections import Counter, defaultdict, namedtuple
+from metrics import metrics
+from utils import get_logger, config
 
 logger = get_logger(__name__)
 
+retrieve_seconds = metrics.histogram("rag_retrieve_seconds", "Knowledge retrieval time per query")
+
+TOKEN_RE = re.compile(r"\w+")
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+# Immutable snapshot of everything retrieve() reads, swapped in with a single assignment
+RAGIndex = namedtuple("RAGIndex", ["chunks", "postings", "chunk_lengths", "avg_chunk_length"])
+EMPTY_INDEX = RAGIndex([], {}, [], 0.0)
+
+# Bump whenever the chunking/tokenization or snapshot layout changes
+SNAPSHOT_VERSION = 2
+
+def default_snapshot_path():
+    if config.get("RAG_SNAPSHOT_PATH"):
+        return config["RAG_SNAPSHOT_PATH"]
+    # Prefer the persistent disk mounted on Render
+    if os.path.isdir("/data"):
+        return "/data/rag-index.snapshot"
+    return os.path.join("data", "rag-index.snapshot")
+
 class LighterRAG:
     """
     A memory-efficient alternative to sentence-transformers.
-    Uses simple keyword matching to find relevant text chunks.
+    Ranks text chunks with BM25 over an in-memory inverted index.
     """
-    def __init__(self, data_dir="data/rag-knowledge"):
+    # Standard BM25 parameters
+    k1 = 1.5
+    b = 0.75
+
+    def __init__(self, data_dir="data/rag-knowledge", reload_interval=None, snapshot_path=None):
         self.data_dir = data_dir
-        self.chunks = []
+        self.snapshot_path = snapshot_path if snapshot_path is not None else default_snapshot_path()
+        # Seconds between mtime checks from retrieve(); 0 disables auto reload
+        if reload_interval is None:
+            reload_interval = int(config.get("RAG_RELOAD_INTERVAL") or 60)
+        self.reload_interval = reload_interval
+        self.index = EMPTY_INDEX
+        # file name (relative to data_dir) -> {"fingerprint": (mtime_ns, size), "chunks": [(text, term counts, length)]}
+        self._files = {}
+        self._reload_lock = threading.Lock()
+        self._last_check = 0.0
         self.is_loaded = False
-        
-    def load_documents(self):
-        if self.is_loaded:
-            return
-            
-        self.chunks = []
+
+    @property
+    def chunks(self):
+        return self.index.chunks
+
+    def _find_files(self):
+        """(name relative to data_dir, path) of every knowledge file."""
         # Support both the root data/ and backend/data/ paths
         search_path = os.path.join(self.data_dir, "*.txt")
         files = glob.glob(search_path)
-        
+
         if not files and not os.path.isabs(self.data_dir):
             # Try parent directory if data is outside backend/
             alt_path = os.path.join("..", self.data_dir, "*.txt")
             files = glob.glob(alt_path)
+        return sorted((os.path.basename(path), path) for path in files)
 
-        for file_path in files:
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    # Split by double newlines (paragraphs/sections)
-                    sections = [s.strip() for s in content.split('\n\n') if s.strip()]
-                    self.chunks.extend(sections)
-            except Exception as e:
-                logger.error(f"Error reading {file_path}: {e}")
-        
-        self.is_loaded = True
-        logger.info(f"LighterRAG loaded with {len(self.chunks)} knowledge chunks.")
+    def _read_file(self, file_path):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        # Split by double newlines (paragraphs/sections)
+        sections = [s.strip() for s in content.split('\n\n') if s.strip()]
+        chunks = []
+        for section in sections:
+            terms = tokenize(section)
+            chunks.append((section, Counter(terms), len(terms)))
+        return chunks
 
-    def retrieve(self, query, top_k=2):
+    def _build_index(self, files):
+        chunks = []
+        postings = defaultdict(list)
+        lengths = []
+        for file_path in sorted(files):
+            for text, term_counts, length in files[file_path]["chunks"]:
+                idx = len(chunks)
+                chunks.append(text)
+                lengths.append(length)
+                for term, tf in term_counts.items():
+                    postings[term].append((idx, tf))
+
+        avg_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+        return RAGIndex(chunks, dict(postings), lengths, avg_length)
+
+    def _load_snapshot(self):
+        """
+        Reads the whole snapshot into memory. It is plain JSON, so a file on
+        the shared disk can at worst be ignored as unreadable, never run code.
+        """
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return None
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            if snapshot.get("version") != SNAPSHOT_VERSION:
+                return None
+            files = {
+                name: {
+                    "fingerprint": tuple(entry["fingerprint"]),
+                    "chunks": [(text, Counter(term_counts), length) for text, term_counts, length in entry["chunks"]],
+                }
+                for name, entry in snapshot["files"].items()
+            }
+            chunks, postings, lengths, avg_length = snapshot["index"]
+            return {"files": files, "index": RAGIndex(chunks, postings, lengths, avg_length)}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable RAG snapshot {self.snapshot_path}: {e}")
+            return None
+
+    def _save_snapshot(self, files, index):
+        if not self.snapshot_path:
+            return
+        try:
+            snapshot_dir = os.path.dirname(self.snapshot_path)
+            if snapshot_dir:
+                os.makedirs(snapshot_dir, exist_ok=True)
+            tmp_path = self.snapshot_path + ".tmp"
+            # Files are keyed by their name under data_dir, so the snapshot survives a change of working directory
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"version": SNAPSHOT_VERSION, "files": files, "index": tuple(index)}, f, separators=(",", ":"))
+            os.replace(tmp_path, self.snapshot_path)
+        except Exception as e:
+            logger.warning(f"Failed to write RAG snapshot {self.snapshot_path}: {e}")
+
+    def reload(self):
+        """
+        Re-reads only the knowledge files whose mtime or size changed, drops
+        deleted files and swaps in the rebuilt index. Returns True if anything
+        changed.
+        """
+        with self._reload_lock:
+            self._last_check = time.monotonic()
+            snapshot = None
+            if not self.is_loaded:
+                # Seed the file cache from disk so only files edited since the snapshot are re-read
+                snapshot = self._load_snapshot()
+                if snapshot:
+                    self._files = snapshot["files"]
+            files = {}
+            changed = []
+            for name, file_path in self._find_files():
+                try:
+                    stat = os.stat(file_path)
+                    fingerprint = (stat.st_mtime_ns, stat.st_size)
+                    cached = self._files.get(name)
+                    if cached and cached["fingerprint"] == fingerprint:
+                        files[name] = cached
+                        continue
+                    files[name] = {"fingerprint": fingerprint, "chunks": self._read_file(file_path)}
+                    changed.append(name)
+                except Exception as e:
+                    logger.error(f"Error reading {file_path}: {e}")
+                    # Keep serving the last good version of the file
+                    if name in self._files:
+                        files[name] = self._files[name]
+
+            removed = [path for path in self._files if path not in files]
+            was_loaded = self.is_loaded
+            if was_loaded and not changed and not removed:
+                return False
+
+            if snapshot and not changed and not removed:
+                self.index = snapshot["index"]
+            else:
+                self.index = self._build_index(files)
+                self._save_snapshot(files, self.index)
+            self._files = files
+            self.is_loaded = True
+
+        if was_loaded:
+            logger.info(f"LighterRAG reloaded {len(changed)} changed and {len(removed)} removed files.")
+        logger.info(f"LighterRAG loaded with {len(self.index.chunks)} knowledge chunks ({len(self.index.postings)} terms).")
+        return True
+
+    def load_documents(self):
+        if self.is_loaded:
+            return
+        self.reload()
+
+    def warm_up(self):
+        """Loads the index outside the request path (called from the app lifespan)."""
+        started = time.monotonic()
+        self.load_documents()
+        logger.info(f"LighterRAG warm-up finished in {time.monotonic() - started:.3f}s.")
+
+    def _maybe_reload(self):
         if not self.is_loaded:
             self.load_documents()
-            
-        if not self.chunks:
+        elif self.reload_interval and time.monotonic() - self._last_check >= self.reload_interval:
+            if not self._reload_lock.locked():
+                self.reload()
+
+    @retrieve_seconds.timed()
+    def retrieve(self, query, top_k=2):
+        self._maybe_reload()
+
+        # Read the index once so a concurrent reload can't mix two versions
+        index = self.index
+        if not index.chunks:
             return []
 
-        # Simple keyword relevance scoring
-        query_words = set(query.lower().split())
-        scored_chunks = []
-        
-        for chunk in self.chunks:
-            chunk_lower = chunk.lower()
-            score = sum(1 for word in query_words if word in chunk_lower)
-            scored_chunks.append((score, chunk))
-            
-        # Sort by score descending
-        scored_chunks.sort(key=lambda x: x[0], reverse=True)
-        
-        # Return top K chunks that have at least some match
-        return [chunk for score, chunk in scored_chunks[:top_k] if score > 0]
+        # BM25 over the postings of the query terms only
+        n_chunks = len(index.chunks)
+        avg_length = index.avg_chunk_length or 1.0
+        scores = defaultdict(float)
+
+        for term in set(tokenize(query)):
+            postings = index.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_chunks - len(postings) + 0.5) / (len(postings) + 0.5))
+            for idx, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * index.chunk_lengths[idx] / avg_length)
+                scores[idx] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        # Heap selection instead of sorting every scored chunk; only chunks with a match are scored
+        top = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        return [index.chunks[idx] for idx, score in top if score > 0]
 
 rag_system = LighterRAG()
@@ -0,0 +1,146 @@
+import time
+import threading
+import praw
+import prawcore
+from utils import get_logger, config
+
+logger = get_logger(__name__)
+
+class RateLimitBudget:
+    """
+    Reddit's per-client request budget as last reported in the
+    X-Ratelimit-* response headers. Every request made through the shared
+    client draws from it; once only `reserve` requests are left, callers
+    wait for the window to reset instead of running into 429s.
+    """
+    def __init__(self, reserve=5):
+        self.reserve = reserve
+        self.remaining = None
+        self.used = None
+        self.reset_at = None  # monotonic time the current window ends
+        self.requests = 0
+        self.throttled = 0
+        self.throttled_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if self.reset_at is not None and now >= self.reset_at:
+                    # New window: the next response reports the real figures
+                    self.remaining = None
+                    self.reset_at = None
+                if self.remaining is None or self.remaining > self.reserve:
+                    if self.remaining is not None:
+                        # Count it now so concurrent callers see the request before its response arrives
+                        self.remaining -= 1
+                    self.requests += 1
+                    return
+                wait = self.reset_at - now
+                self.throttled += 1
+                self.throttled_seconds += wait
+            logger.warning(f"Reddit rate limit nearly exhausted, waiting {wait:.1f}s")
+            time.sleep(wait)
+
+    def update(self, headers):
+        if "x-ratelimit-remaining" not in headers:
+            return
+        try:
+            remaining = int(float(headers["x-ratelimit-remaining"]))
+            used = int(float(headers.get("x-ratelimit-used", 0)))
+            reset = float(headers.get("x-ratelimit-reset", 0))
+        except ValueError:
+            return
+        with self._lock:
+            self.remaining = remaining
+            self.used = used
+            self.reset_at = time.monotonic() + reset
+
+    def stats(self):
+        with self._lock:
+            return {
+                "remaining": self.remaining,
+                "used": self.used,
+                "reset_in": round(max(0.0, self.reset_at - time.monotonic()), 1) if self.reset_at is not None else None,
+                "reserve": self.reserve,
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "throttled_seconds": round(self.throttled_seconds, 1),
+            }
+
+class BudgetedRequestor(prawcore.Requestor):
+    """prawcore requestor that checks every request against a shared RateLimitBudget."""
+    def __init__(self, *args, budget=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.budget = budget
+
+    def request(self, *args, **kwargs):
+        self.budget.acquire()
+        response = super().request(*args, **kwargs)
+        self.budget.update(response.headers)
+        return response
+
+class SerializedReddit(praw.Reddit):
+    """
+    praw.Reddit whose API calls run one at a time. PRAW is not thread-safe
+    (the prawcore session, its rate limiter and the token refresh keep
+    shared state), and the shared client is used from the scheduler's job
+    threads and the DM workers. Every request, including listing pages,
+    lazy object fetches, replies and token refreshes, goes through
+    Reddit.request, so one lock there covers them all. The DM workers still
+    generate replies concurrently; only their Reddit calls queue up.
+    """
+    def __init__(self, *args, **kwargs):
+        self._request_lock = threading.RLock()
+        super().__init__(*args, **kwargs)
+
+    def request(self, *args, **kwargs):
+        with self._request_lock:
+            return super().request(*args, **kwargs)
+
+class RedditClientManager:
+    """
+    Lazily builds one praw.Reddit and hands the same instance to every job.
+    Reusing it keeps the HTTP session (and its keep-alive connections) and
+    the OAuth access token, which prawcore only refreshes once it expires.
+    The instance serializes its API calls, see SerializedReddit.
+    """
+    def __init__(self, budget):
+        self.budget = budget
+        self.created = 0
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _build(self):
+        username = config["REDDIT_USERNAME"] or "unknown_user"
+        user_agent = f"web:SalesAutomation:v1.0.0 (by /u/{username})"
+
+        return SerializedReddit(
+            client_id=config["REDDIT_CLIENT_ID"],
+            client_secret=config["REDDIT_CLIENT_SECRET"],
+            refresh_token=config["REDDIT_REFRESH_TOKEN"],
+            user_agent=user_agent,
+            username=config["REDDIT_USERNAME"],
+            requestor_class=BudgetedRequestor,
+            requestor_kwargs={"budget": self.budget},
+        )
+
+    def get(self):
+        """Returns the shared client, or None if Reddit credentials are not configured."""
+        if not config.get("REDDIT_CLIENT_ID"):
+            return None
+        with self._lock:
+            if self._client is None:
+                self._client = self._build()
+                self.created += 1
+                logger.info("Reddit client initialized")
+            return self._client
+
+    def stats(self):
+        return {"initialized": self._client is not None, "created": self.created, "rate_limit": self.budget.stats()}
+
+reddit_clients = RedditClientManager(RateLimitBudget(reserve=config["REDDIT_RATELIMIT_RESERVE"]))
+
+def get_reddit_client():
+    return reddit_clients.get()
@@ -0,0 +1,127 @@
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from database import SessionLocal, ResponseCacheEntry
+from utils import get_logger
+
+logger = get_logger(__name__)
+
+WHITESPACE_RE = re.compile(r"\s+")
+
+def normalize_text(text):
+    """Case/whitespace/trailing-punctuation insensitive form used for cache keys."""
+    return WHITESPACE_RE.sub(" ", (text or "").lower()).strip().strip("?!.").strip()
+
+def make_cache_key(prompt, context, model):
+    raw = "\x1f".join([model, normalize_text(context), normalize_text(prompt)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache with TTL for LLM responses, optionally backed by
+    the llm_response_cache table so entries survive restarts.
+    """
+    def __init__(self, max_entries=1000, ttl=86400, persist=False):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.persist = persist
+        self._entries = OrderedDict()  # key -> (expires_at monotonic, response)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, response = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return response
+                del self._entries[key]
+                self.expired += 1
+
+        loaded = self._load(key) if self.persist else None
+        with self._lock:
+            if loaded is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        response, remaining = loaded
+        # Keep the stored entry's expiry rather than granting it a fresh ttl
+        self._remember(key, response, ttl=remaining)
+        return response
+
+    def set(self, key, response, model=None):
+        self._remember(key, response)
+        if self.persist:
+            self._store(key, response, model)
+
+    def _remember(self, key, response, ttl=None):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _load(self, key):
+        """Returns (response, seconds of ttl left) for a live stored entry, or None."""
+        db = SessionLocal()
+        try:
+            entry = db.query(ResponseCacheEntry).filter(ResponseCacheEntry.key == key).first()
+            if not entry:
+                return None
+            remaining = (entry.created_at + timedelta(seconds=self.ttl) - datetime.utcnow()).total_seconds()
+            if remaining <= 0:
+                db.delete(entry)
+                db.commit()
+                return None
+            return entry.response, remaining
+        except Exception as e:
+            logger.error(f"Failed to read response cache: {e}")
+            return None
+        finally:
+            db.close()
+
+    def _store(self, key, response, model):
+        db = SessionLocal()
+        try:
+            entry = db.query(ResponseCacheEntry).filter(ResponseCacheEntry.key == key).first()
+            if not entry:
+                entry = ResponseCacheEntry(key=key)
+                db.add(entry)
+            entry.response = response
+            entry.model = model
+            entry.created_at = datetime.utcnow()
+            db.commit()
+        except Exception as e:
+            logger.error(f"Failed to write response cache: {e}")
+        finally:
+            db.close()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "persist": self.persist,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expired": self.expired,
+            }
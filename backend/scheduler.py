@@ -1,7 +1,7 @@
 import random
 from datetime import datetime, timedelta
 from database import SessionLocal, PostTemplate
-from monitor import get_reddit_client
+from reddit_client import get_reddit_client
 from utils import get_logger
 
 logger = get_logger(__name__)
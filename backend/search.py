@@ -0,0 +1,115 @@
+import re
+import sys
+from sqlalchemy import func, literal_column, table, column
+from sqlalchemy.orm import defer
+from database import Lead, Conversation, Message, SEARCH_INDEXES, LEAD_INTERNAL_COLUMNS
+from db_writer import db_writer
+from utils import get_logger
+
+logger = get_logger(__name__)
+
+# Wrapped around matched terms in snippets; the dashboard renders the text between them highlighted
+HIGHLIGHT_OPEN = "<mark>"
+HIGHLIGHT_CLOSE = "</mark>"
+SNIPPET_TOKENS = 16
+
+# Title matches count for more than body matches
+LEAD_TITLE_WEIGHT = 5.0
+LEAD_BODY_WEIGHT = 1.0
+
+MAX_SEARCH_LIMIT = 100
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+leads_fts = table("leads_fts", column("rowid"))
+messages_fts = table("messages_fts", column("rowid"))
+
+def build_match_query(text):
+    """
+    Turns free text into an FTS5 query: every word must occur, the last one
+    as a prefix so results update while typing. Words are quoted, so FTS5
+    operators and punctuation in the input can't cause a syntax error.
+    Returns None if the text has no words.
+    """
+    tokens = TOKEN_RE.findall(text or "")
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+def _fts(name):
+    # The hidden column named after the table, which MATCH, bm25() and snippet() take
+    return literal_column(name)
+
+def _snippet(name, column_index=-1):
+    return func.snippet(_fts(name), column_index, HIGHLIGHT_OPEN, HIGHLIGHT_CLOSE, "…", SNIPPET_TOKENS)
+
+def search_leads(db, text, subreddit=None, status=None, limit=20, offset=0):
+    """Leads matching `text`, best match first, each with a highlighted snippet and its bm25 rank."""
+    match = build_match_query(text)
+    if not match:
+        return []
+    rank = func.bm25(_fts("leads_fts"), LEAD_TITLE_WEIGHT, LEAD_BODY_WEIGHT)
+    query = (
+        db.query(Lead, _snippet("leads_fts", 1).label("snippet"), rank.label("rank"))
+        .join(leads_fts, leads_fts.c.rowid == Lead.id)
+        .filter(_fts("leads_fts").op("MATCH")(match))
+        .options(*(defer(getattr(Lead, name)) for name in LEAD_INTERNAL_COLUMNS))
+    )
+    if subreddit:
+        query = query.filter(Lead.subreddit == subreddit)
+    if status:
+        query = query.filter(Lead.status == status)
+    rows = query.order_by(rank, Lead.id.desc()).limit(min(limit, MAX_SEARCH_LIMIT)).offset(offset).all()
+
+    results = []
+    for lead, snippet, score in rows:
+        result = {c.key: getattr(lead, c.key) for c in Lead.__table__.columns if c.key not in LEAD_INTERNAL_COLUMNS}
+        result.update(snippet=snippet, rank=score)
+        results.append(result)
+    return results
+
+def search_messages(db, text, status=None, limit=20, offset=0):
+    """Conversation messages matching `text`, best match first, with the conversation they belong to."""
+    match = build_match_query(text)
+    if not match:
+        return []
+    rank = func.bm25(_fts("messages_fts"))
+    query = (
+        db.query(
+            Message.id,
+            Message.role,
+            Message.created_at,
+            Conversation.reddit_username,
+            Conversation.status,
+            _snippet("messages_fts").label("snippet"),
+            rank.label("rank"),
+        )
+        .join(messages_fts, messages_fts.c.rowid == Message.id)
+        .join(Conversation, Conversation.id == Message.conversation_id)
+        .filter(_fts("messages_fts").op("MATCH")(match))
+    )
+    if status:
+        query = query.filter(Conversation.status == status)
+    rows = query.order_by(rank, Message.id.desc()).limit(min(limit, MAX_SEARCH_LIMIT)).offset(offset).all()
+    return [row._asdict() for row in rows]
+
+def rebuild_search_indexes():
+    """Re-reads every full-text index from its source table, then merges its segments."""
+    def write(db):
+        for name in SEARCH_INDEXES:
+            db.connection().exec_driver_sql(f"INSERT INTO {name}({name}) VALUES ('rebuild')")
+            db.connection().exec_driver_sql(f"INSERT INTO {name}({name}) VALUES ('optimize')")
+
+    db_writer.run(write)
+    logger.info(f"Rebuilt search indexes: {', '.join(SEARCH_INDEXES)}")
+
+if __name__ == "__main__":
+    # python search.py rebuild
+    if sys.argv[1:] != ["rebuild"]:
+        sys.exit("usage: python search.py rebuild")
+    from database import init_db
+    init_db()
+    rebuild_search_indexes()
+    db_writer.stop()
@@ -0,0 +1,147 @@
+import math
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from database import Lead
+from utils import get_logger
+
+logger = get_logger(__name__)
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings, sized for `capacity` items at `error_rate` false positives."""
+    def __init__(self, capacity, error_rate=0.0001):
+        self.capacity = capacity
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+class SeenPosts:
+    """
+    Ids of posts the monitor has already evaluated, matched or not, so they
+    are skipped without a database lookup. Recent ids sit in an exact LRU
+    with a per-entry expiry; every id also goes into a Bloom filter that
+    keeps a compact record of the whole `ttl` window after the LRU has
+    evicted it. The filter is rotated in two generations, so an id is
+    forgotten between ttl/2 and ttl after it was added.
+
+    Only the LRU says "seen" for sure. A Bloom hit means "maybe seen": the
+    caller re-checks the post (a keyword match, then the leads table for
+    matches) and reports the hits that turned out new via
+    record_false_positives().
+    """
+    def __init__(self, max_entries=20000, ttl=7 * 86400, bloom_capacity=200000, error_rate=0.0001):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.bloom_capacity = bloom_capacity
+        self.error_rate = error_rate
+        self._recent = OrderedDict()  # id -> expiry (monotonic)
+        self._bloom = BloomFilter(bloom_capacity, error_rate)
+        self._previous_bloom = None
+        self._bloom_started = time.monotonic()
+        self._lock = threading.Lock()
+        self.warmed = False
+        self.hits = 0
+        self.misses = 0
+        self.bloom_hits = 0
+        self.false_positives = 0
+
+    def _rotate(self, now):
+        if now - self._bloom_started >= self.ttl / 2 or self._bloom.count >= self.bloom_capacity:
+            self._previous_bloom = self._bloom
+            self._bloom = BloomFilter(self.bloom_capacity, self.error_rate)
+            self._bloom_started = now
+
+    def _recently_seen(self, post_id, now):
+        expiry = self._recent.get(post_id)
+        if expiry is None:
+            return False
+        if expiry > now:
+            self._recent.move_to_end(post_id)
+            return True
+        del self._recent[post_id]
+        return False
+
+    def _maybe_seen(self, post_id):
+        return post_id in self._bloom or (self._previous_bloom is not None and post_id in self._previous_bloom)
+
+    def __contains__(self, post_id):
+        """True only for ids known to be seen, never on a Bloom filter hit alone."""
+        with self._lock:
+            return self._recently_seen(post_id, time.monotonic())
+
+    def check(self, post_ids):
+        """
+        Returns (unseen, maybe_seen): the ids (in order, without repeats) not
+        known to be seen, and the set of those the Bloom filter holds, which
+        the caller must confirm before treating them as seen.
+        """
+        now = time.monotonic()
+        unseen, maybe_seen = [], set()
+        with self._lock:
+            for post_id in dict.fromkeys(post_ids):
+                if self._recently_seen(post_id, now):
+                    self.hits += 1
+                    continue
+                self.misses += 1
+                unseen.append(post_id)
+                if self._maybe_seen(post_id):
+                    self.bloom_hits += 1
+                    maybe_seen.add(post_id)
+        return unseen, maybe_seen
+
+    def record_false_positives(self, count):
+        """Counts Bloom hits that turned out to be new posts."""
+        with self._lock:
+            self.false_positives += count
+
+    def add(self, post_ids):
+        now = time.monotonic()
+        with self._lock:
+            self._rotate(now)
+            for post_id in post_ids:
+                self._recent[post_id] = now + self.ttl
+                self._recent.move_to_end(post_id)
+                self._bloom.add(post_id)
+            while len(self._recent) > self.max_entries:
+                self._recent.popitem(last=False)
+
+    def warm_up(self, db):
+        """Seeds the set with the leads stored within the ttl window."""
+        since = datetime.utcnow() - timedelta(seconds=self.ttl)
+        rows = db.query(Lead.reddit_id).filter(Lead.created_at >= since).order_by(Lead.created_at.desc()).limit(self.bloom_capacity)
+        post_ids = [row[0] for row in rows if row[0]]
+        # Oldest first so the newest end up at the hot end of the LRU
+        self.add(reversed(post_ids))
+        self.warmed = True
+        logger.info(f"Seen-post set warmed with {len(post_ids)} recent leads")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "recent": len(self._recent),
+                "bloom_items": self._bloom.count + (self._previous_bloom.count if self._previous_bloom else 0),
+                "bloom_bytes": len(self._bloom.bits),
+                "hits": self.hits,
+                "misses": self.misses,
+                "bloom_hits": self.bloom_hits,
+                "false_positives": self.false_positives,
+                "warmed": self.warmed,
+            }
@@ -0,0 +1,58 @@
+from matcher import KeywordMatcher
+from monitor import KEYWORDS
+
+# The keyword list before the matcher, checked with a plain substring test
+BASELINE_KEYWORDS = [
+    "commission", "sales", "remote work", "freelance",
+    "side hustle", "earn money", "work from home", "closer", "appointment setter",
+]
+
+# Posts the substring check flagged; the shipped KEYWORDS must flag them too
+BASELINE_MATCHES = [
+    "Commission only role, paid weekly",
+    "Uncapped commissions for closers",
+    "Looking for salespeople",
+    "Hiring a Salesforce admin",
+    "Open to remote working arrangements",
+    "We hire remote workers worldwide",
+    "Freelancers welcome",
+    "Best side hustles for 2024",
+    "How to earn money online",
+    "Earn moneymaking skills fast",
+    "I work from home three days a week",
+    "Looking for a closer",
+    "Appointment setters needed",
+]
+
+NOT_MATCHED = [
+    "Looking for a graphic designer",
+    "Just a normal Monday at the office",
+    "The store is closed today",
+]
+
+def baseline(text):
+    text = text.lower()
+    return any(keyword in text for keyword in BASELINE_KEYWORDS)
+
+def test_shipped_keywords_keep_every_baseline_match():
+    matcher = KeywordMatcher(KEYWORDS)
+    for text in BASELINE_MATCHES:
+        assert baseline(text), text
+        assert matcher.matches(text), text
+
+def test_shipped_keywords_skip_unrelated_posts():
+    matcher = KeywordMatcher(KEYWORDS)
+    for text in NOT_MATCHED:
+        assert not baseline(text), text
+        assert not matcher.matches(text), text
+
+def test_star_inside_a_phrase_prefix_matches_that_word():
+    matcher = KeywordMatcher(["work* from home"])
+    assert matcher.matched_keywords("She works from home") == ["work* from home"]
+    assert matcher.matched_keywords("Working   from home is great") == ["work* from home"]
+    assert not matcher.matches("homework from homes")
+
+def test_unstarred_keywords_match_whole_words_only():
+    matcher = KeywordMatcher(["closer"])
+    assert matcher.matches("Need a closer.")
+    assert not matcher.matches("Need closers")
@@ -0,0 +1,103 @@
+import threading
+
+from near_duplicates import NearDuplicateIndex, fingerprint, similarity, FINGERPRINT_LENGTH
+
+AD = (
+    "We are hiring a remote high ticket sales closer for our coaching program. "
+    "Commission only, 20% of every closed deal, paid weekly. Warm leads and calls "
+    "are booked for you, scripts provided. Calls run Monday to Friday in the EST "
+    "timezone. DM me with your closing experience and availability."
+)
+
+# Known cross-posts of AD: each pair should be grouped
+CROSS_POSTS = [
+    ("Hiring a sales closer", AD.replace("Friday", "Thursday")),
+    ("Hiring a sales closer", AD + " Also posted in r/sales."),
+    ("HIRING a Sales Closer!!", AD.upper().replace(".", "!")),
+    ("Hiring a sales closer", AD + " Apply here: https://example.com/apply?ref=forhire"),
+    ("Hiring a sales closer", AD.replace("20%", "25%").replace("weekly", "biweekly")),
+]
+
+# Known distinct posts in the same niche: none of them should be grouped with AD or each other
+DISTINCT = [
+    ("Looking for an appointment setter", "Our solar company needs an appointment setter to book calls with homeowners. Base pay plus a bonus per kept appointment, full training, fully remote."),
+    ("Hiring SDR for B2B SaaS", "Series A SaaS startup hiring a sales development rep. You will prospect on LinkedIn, run cold email sequences and hand qualified meetings to our account executives."),
+    ("[For Hire] Experienced closer", "I have closed high ticket coaching offers for three years and I am looking for a new offer to represent. Commission only is fine if the leads are warm."),
+    ("Need a cold caller for real estate", "Real estate investor looking for a cold caller to call motivated sellers from our lists. Paid hourly plus a bonus for every signed contract, Philippines based callers welcome."),
+    ("Insurance agency hiring", "Licensed life insurance agents wanted. We provide leads, a CRM and daily training. Uncapped commission, top producers make six figures in their first year."),
+]
+
+def index():
+    return NearDuplicateIndex(threshold=0.7, max_entries=1000, ttl=3600)
+
+def test_fingerprint_is_a_stable_minhash_signature():
+    fp = fingerprint("Hiring a sales closer", AD)
+    assert len(fp) == FINGERPRINT_LENGTH
+    assert fp == fingerprint("Hiring a sales closer", AD)
+    assert fingerprint("Hiring", "closer") is None  # too short to compare
+
+def test_cross_posts_are_grouped_under_the_first_copy():
+    items = [("original", fingerprint("Hiring a sales closer", AD))]
+    items += [(f"copy{i}", fingerprint(title, body)) for i, (title, body) in enumerate(CROSS_POSTS)]
+    canonicals, claimed = index().claim(items)
+    assert claimed == {"original"}
+    assert canonicals == {f"copy{i}": "original" for i in range(len(CROSS_POSTS))}
+
+def test_distinct_posts_are_not_grouped():
+    items = [("original", fingerprint("Hiring a sales closer", AD))]
+    items += [(f"post{i}", fingerprint(title, body)) for i, (title, body) in enumerate(DISTINCT)]
+    canonicals, claimed = index().claim(items)
+    assert canonicals == {}
+    assert len(claimed) == len(items)
+
+def test_similarity_separates_cross_posts_from_distinct_posts():
+    original = bytes.fromhex(fingerprint("Hiring a sales closer", AD))
+    for title, body in CROSS_POSTS:
+        assert similarity(original, bytes.fromhex(fingerprint(title, body))) >= 0.7
+    for title, body in DISTINCT:
+        assert similarity(original, bytes.fromhex(fingerprint(title, body))) < 0.3
+
+def test_claims_group_previously_claimed_leads():
+    duplicates = index()
+    duplicates.claim([("first", fingerprint("Hiring a sales closer", AD))])
+    canonicals, claimed = duplicates.claim([("second", fingerprint(*CROSS_POSTS[0]))])
+    assert canonicals == {"second": "first"}
+    assert claimed == set()
+
+def test_concurrent_claims_of_the_same_ad_leave_one_canonical():
+    duplicates = index()
+    fp = fingerprint("Hiring a sales closer", AD)
+    results = []
+    start = threading.Barrier(8)
+
+    def claim(i):
+        start.wait()
+        results.append(duplicates.claim([(f"post{i}", fp)]))
+
+    threads = [threading.Thread(target=claim, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    claimed = set().union(*(ids for _, ids in results))
+    assert len(claimed) == 1
+    assert sum(len(canonicals) for canonicals, _ in results) == 7
+
+def test_released_claims_are_no_longer_canonical():
+    duplicates = index()
+    _, claimed = duplicates.claim([("failed", fingerprint("Hiring a sales closer", AD))])
+    duplicates.release(claimed)
+    canonicals, claimed = duplicates.claim([("retry", fingerprint(*CROSS_POSTS[1]))])
+    assert canonicals == {}
+    assert claimed == {"retry"}
+
+def test_resubmitted_lead_is_neither_its_own_duplicate_nor_claimed_again():
+    duplicates = index()
+    fp = fingerprint("Hiring a sales closer", AD)
+    duplicates.claim([("lead", fp)])
+    assert duplicates.claim([("lead", fp)]) == ({}, set())
+
+def test_disabled_index_groups_nothing():
+    duplicates = NearDuplicateIndex(enabled=False)
+    fp = fingerprint("Hiring a sales closer", AD)
+    assert duplicates.claim([("a", fp), ("b", fp)]) == ({}, set())
@@ -0,0 +1,18 @@
+from seen_posts import SeenPosts
+
+def test_recent_ids_are_seen():
+    seen = SeenPosts(max_entries=10, ttl=3600)
+    seen.add(["a", "b"])
+    assert seen.check(["a", "c", "b", "c"]) == (["c"], set())
+    assert "a" in seen
+
+def test_bloom_hits_are_only_maybe_seen():
+    seen = SeenPosts(max_entries=2, ttl=3600)
+    seen.add(["a", "b", "c", "d"])
+    # "a" and "b" left the LRU; the Bloom filter alone must not skip them
+    assert "a" not in seen
+    unseen, maybe_seen = seen.check(["a", "b", "d", "e"])
+    assert unseen == ["a", "b", "e"]
+    assert maybe_seen == {"a", "b"}
+    seen.record_false_positives(1)
+    assert seen.stats()["false_positives"] == 1
@@ -1,20 +1,27 @@
 import os
+import queue
+import atexit
 import random
 import logging
+from logging.handlers import QueueHandler, QueueListener
 from datetime import datetime
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("system.log"),
-        logging.StreamHandler()
-    ]
-)
+# Configure logging: callers only enqueue the record, a listener thread
+# writes it to system.log and stdout so no log call waits on file I/O
+_log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+_log_handlers = [logging.FileHandler("system.log"), logging.StreamHandler()]
+for _handler in _log_handlers:
+    _handler.setFormatter(_log_formatter)
+
+log_queue = queue.SimpleQueue()
+logging.getLogger().setLevel(logging.INFO)
+logging.getLogger().addHandler(QueueHandler(log_queue))
+log_listener = QueueListener(log_queue, *_log_handlers)
+log_listener.start()
+atexit.register(log_listener.stop)
 
 def get_logger(name):
     return logging.getLogger(name)
@@ -39,7 +46,48 @@ config = {
     "REDDIT_CLIENT_SECRET": os.getenv("REDDIT_CLIENT_SECRET"),
     "REDDIT_REFRESH_TOKEN": os.getenv("REDDIT_REFRESH_TOKEN"),
     "REDDIT_USERNAME": os.getenv("REDDIT_USERNAME"),
+    "REDDIT_RATELIMIT_RESERVE": int(os.getenv("REDDIT_RATELIMIT_RESERVE", "5")),
     "GOOGLE_AI_API_KEY": os.getenv("GOOGLE_AI_API_KEY"),
     "GROQ_API_KEY": os.getenv("GROQ_API_KEY"),
     "DISCORD_WEBHOOK_URL": os.getenv("DISCORD_WEBHOOK_URL"),
+    "RAG_RELOAD_INTERVAL": os.getenv("RAG_RELOAD_INTERVAL", "60"),
+    "RAG_SNAPSHOT_PATH": os.getenv("RAG_SNAPSHOT_PATH"),
+    "ENABLE_BACKGROUND_JOBS": os.getenv("ENABLE_BACKGROUND_JOBS", "").lower() in ("1", "true", "yes"),
+    "WORKER_THREADS": int(os.getenv("WORKER_THREADS", "2")),
+    "DM_WORKERS": int(os.getenv("DM_WORKERS", "4")),
+    "AI_CACHE_MAX_ENTRIES": int(os.getenv("AI_CACHE_MAX_ENTRIES", "1000")),
+    "AI_CACHE_TTL": int(os.getenv("AI_CACHE_TTL", "86400")),
+    "AI_CACHE_PERSIST": os.getenv("AI_CACHE_PERSIST", "").lower() in ("1", "true", "yes"),
+    "LEAD_SCORING_BATCH_SIZE": int(os.getenv("LEAD_SCORING_BATCH_SIZE", "10")),
+    "EVENT_BUFFER_SIZE": int(os.getenv("EVENT_BUFFER_SIZE", "1000")),
+    "EVENT_QUEUE_SIZE": int(os.getenv("EVENT_QUEUE_SIZE", "200")),
+    "AI_TIMEOUT": float(os.getenv("AI_TIMEOUT", "20")),
+    "AI_HEDGE": os.getenv("AI_HEDGE", "").lower() in ("1", "true", "yes"),
+    "AI_HEDGE_MIN_DELAY": float(os.getenv("AI_HEDGE_MIN_DELAY", "2")),
+    "AI_BREAKER_THRESHOLD": int(os.getenv("AI_BREAKER_THRESHOLD", "3")),
+    "AI_BREAKER_COOLDOWN": float(os.getenv("AI_BREAKER_COOLDOWN", "60")),
+    "DB_PERFORMANCE_MODE": os.getenv("DB_PERFORMANCE_MODE", "true").lower() in ("1", "true", "yes"),
+    "DB_SYNCHRONOUS": os.getenv("DB_SYNCHRONOUS", "NORMAL"),
+    "DB_CACHE_SIZE": int(os.getenv("DB_CACHE_SIZE", "-64000")),  # negative = KiB
+    "DB_MMAP_SIZE": int(os.getenv("DB_MMAP_SIZE", "268435456")),
+    "DB_BUSY_TIMEOUT": int(os.getenv("DB_BUSY_TIMEOUT", "5000")),  # milliseconds
+    "DB_WRITE_BATCH_SIZE": int(os.getenv("DB_WRITE_BATCH_SIZE", "100")),
+    "MONITOR_STREAMING": os.getenv("MONITOR_STREAMING", "true").lower() in ("1", "true", "yes"),
+    "MONITOR_STREAM_MIN_INTERVAL": int(os.getenv("MONITOR_STREAM_MIN_INTERVAL", "60")),
+    "MONITOR_STREAM_MAX_INTERVAL": int(os.getenv("MONITOR_STREAM_MAX_INTERVAL", "900")),
+    "MONITOR_STREAM_TARGET_POSTS": int(os.getenv("MONITOR_STREAM_TARGET_POSTS", "5")),
+    "MONITOR_STREAM_MAX_BACKFILL": int(os.getenv("MONITOR_STREAM_MAX_BACKFILL", "1000")),
+    "SEEN_POSTS_MAX_ENTRIES": int(os.getenv("SEEN_POSTS_MAX_ENTRIES", "20000")),
+    "SEEN_POSTS_TTL_DAYS": float(os.getenv("SEEN_POSTS_TTL_DAYS", "7")),
+    "NEAR_DUPLICATES": os.getenv("NEAR_DUPLICATES", "true").lower() in ("1", "true", "yes"),
+    "NEAR_DUPLICATE_SIMILARITY": float(os.getenv("NEAR_DUPLICATE_SIMILARITY", "0.7")),  # estimated Jaccard over words + word pairs
+    "NEAR_DUPLICATE_MAX_ENTRIES": int(os.getenv("NEAR_DUPLICATE_MAX_ENTRIES", "20000")),
+    "NEAR_DUPLICATE_TTL_DAYS": float(os.getenv("NEAR_DUPLICATE_TTL_DAYS", "7")),
+    "NOTIFY_QUEUE_SIZE": int(os.getenv("NOTIFY_QUEUE_SIZE", "500")),
+    "NOTIFY_COALESCE_SECONDS": float(os.getenv("NOTIFY_COALESCE_SECONDS", "2")),
+    "SYSTEM_LOG_LEVEL": os.getenv("SYSTEM_LOG_LEVEL", "INFO").upper(),
+    "SYSTEM_LOG_BATCH_SIZE": int(os.getenv("SYSTEM_LOG_BATCH_SIZE", "200")),
+    "SYSTEM_LOG_MAX_ROWS": int(os.getenv("SYSTEM_LOG_MAX_ROWS", "50000")),
+    "SYSTEM_LOG_RETENTION_DAYS": float(os.getenv("SYSTEM_LOG_RETENTION_DAYS", "7")),
+    "LOG_ROLLUP_RETENTION_DAYS": float(os.getenv("LOG_ROLLUP_RETENTION_DAYS", "30")),
 }
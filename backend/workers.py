@@ -0,0 +1,165 @@
+import asyncio
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from utils import get_logger, config
+
+logger = get_logger(__name__)
+
+class Job:
+    """
+    A periodic synchronous job run on the worker thread pool.
+    `interval` is either a number of seconds or a callable returning one.
+    """
+    def __init__(self, name, func, interval, timeout=None):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.timeout = timeout
+        self.running = False
+        self.timed_out = False  # the current run was abandoned by its timeout
+        self.runs = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.skipped = 0
+        self.last_started_at = None
+        self.last_finished_at = None
+        self.last_duration = None
+        self.last_error = None
+        self.next_run_at = None
+
+    def next_interval(self):
+        return self.interval() if callable(self.interval) else self.interval
+
+    def status(self):
+        return {
+            "name": self.name,
+            "running": self.running,
+            "runs": self.runs,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "skipped": self.skipped,
+            "last_started_at": self.last_started_at,
+            "last_finished_at": self.last_finished_at,
+            "last_duration": self.last_duration,
+            "last_error": self.last_error,
+            "next_run_at": self.next_run_at,
+            "timeout": self.timeout,
+        }
+
+class WorkerManager:
+    """
+    Runs the blocking background jobs (PRAW, LLM and webhook calls) on a
+    bounded thread pool so they never block the event loop serving the API.
+    A job never overlaps with itself: a run that times out keeps the job
+    marked as running until its thread actually returns, and its late
+    result is not recorded. At most `max_workers` runs are in flight,
+    abandoned ones included: while every thread is busy, due jobs skip
+    their tick rather than queue behind a hung run.
+    """
+    def __init__(self, max_workers=2):
+        self.max_workers = max_workers
+        self.jobs = {}
+        self._executor = None
+        self._tasks = []
+        self._lock = threading.Lock()
+        self.busy = 0  # pool threads running a job, timed-out runs included
+
+    def register(self, name, func, interval, timeout=None):
+        job = Job(name, func, interval, timeout)
+        self.jobs[name] = job
+        return job
+
+    def _execute(self, job):
+        # Runs on a pool thread
+        started = time.monotonic()
+        error = None
+        try:
+            job.func()
+        except Exception as e:
+            error = str(e)
+        finally:
+            with self._lock:
+                job.running = False
+                self.busy -= 1
+                if job.timed_out:
+                    # The timeout was already recorded; the next run owns the status now
+                    job.timed_out = False
+                    logger.warning(f"{job.name} job finished after {time.monotonic() - started:.1f}s, past its {job.timeout}s timeout")
+                    return
+                job.last_duration = round(time.monotonic() - started, 3)
+                job.last_finished_at = datetime.utcnow()
+                job.last_error = error
+                job.runs += 1
+                if error is not None:
+                    job.failures += 1
+        if error is not None:
+            logger.error(f"Error in {job.name} job: {error}")
+
+    async def run_once(self, name):
+        """Runs a job now unless it is already running. Returns False if it was skipped."""
+        job = self.jobs[name]
+        with self._lock:
+            if job.running:
+                job.skipped += 1
+                logger.warning(f"Skipping {job.name} run: previous run still in progress")
+                return False
+            if self.busy >= self.max_workers:
+                job.skipped += 1
+                logger.warning(f"Skipping {job.name} run: all {self.max_workers} worker threads are busy")
+                return False
+            job.running = True
+            self.busy += 1
+        job.last_started_at = datetime.utcnow()
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._get_executor(), self._execute, job)
+        try:
+            # shield() so a timeout stops waiting without cancelling the bookkeeping
+            await asyncio.wait_for(asyncio.shield(future), timeout=job.timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                if not job.running:
+                    # Finished just as the timeout fired
+                    return True
+                job.timed_out = True
+                job.timeouts += 1
+                job.runs += 1
+                job.last_error = f"Timed out after {job.timeout}s"
+            logger.error(f"{job.name} job exceeded its {job.timeout}s timeout")
+        return True
+
+    async def _loop(self, job):
+        while True:
+            await self.run_once(job.name)
+            interval = job.next_interval()
+            job.next_run_at = datetime.utcfromtimestamp(time.time() + interval)
+            logger.info(f"{job.name} sleeping for {interval} seconds")
+            await asyncio.sleep(interval)
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="worker")
+        return self._executor
+
+    def start(self, names=None):
+        for job in self.jobs.values():
+            if names is None or job.name in names:
+                self._tasks.append(asyncio.create_task(self._loop(job)))
+        logger.info(f"Started {len(self._tasks)} background jobs on {self.max_workers} worker threads")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._executor is not None:
+            # Don't wait on a hung PRAW/LLM call during shutdown
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def status(self):
+        return [job.status() for job in self.jobs.values()]
+
+worker_manager = WorkerManager(max_workers=config["WORKER_THREADS"])
@@ -67,6 +67,8 @@ async function scanSubreddits(context: any) {
         }
     }
 
+    const pendingLeads: any[] = [];
+
     for (const subredditName of subredditsToMonitor) {
         try {
             // Use getNewPosts directly from reddit client
@@ -101,19 +103,8 @@ async function scanSubreddits(context: any) {
                     };
                     await redis.set(`lead:${post.id}`, JSON.stringify(leadData));
 
-                    // Sync with Dashboard Backend
-                    if (backendUrl) {
-                        try {
-                            await fetch(`${backendUrl.replace(/\/$/, '')}/api/collector/lead`, {
-                                method: 'POST',
-                                headers: { 'Content-Type': 'application/json' },
-                                body: JSON.stringify(leadData),
-                            });
-                            console.log('Synced lead with dashboard');
-                        } catch (e) {
-                            console.error('Dashboard sync failed:', e);
-                        }
-                    }
+                    // Queued for a single batched sync with the dashboard backend
+                    pendingLeads.push(leadData);
 
                     // Send Discord notification
                     if (webhookUrl) {
@@ -137,6 +128,20 @@ async function scanSubreddits(context: any) {
             console.error(`Error monitoring r/${subredditName}:`, error);
         }
     }
+
+    // Sync with Dashboard Backend in one request per scan
+    if (backendUrl && pendingLeads.length > 0) {
+        try {
+            await fetch(`${backendUrl.replace(/\/$/, '')}/api/collector/leads`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify(pendingLeads),
+            });
+            console.log(`Synced ${pendingLeads.length} leads with dashboard`);
+        } catch (e) {
+            console.error('Dashboard sync failed:', e);
+        }
+    }
 }
 
 // --- Scheduled Job: Monitor Posts ---
@@ -6,11 +6,95 @@ const api = axios.create({
     baseURL: API_URL,
 });
 
-export const getLeads = () => api.get('/leads');
-export const getConversations = () => api.get('/conversations');
+// List endpoints accept filters plus a `cursor`; the next page's cursor comes back in the X-Next-Cursor header
+export const getLeads = (params) => api.get('/leads', { params });
+export const getConversations = (params) => api.get('/conversations', { params });
 export const getConversation = (username) => api.get(`/conversations/${username}`);
 export const toggleTakeover = (username, enable) => api.post(`/conversations/${username}/takeover?enable=${enable}`);
-export const getLogs = () => api.get('/logs');
+export const getLogs = (params) => api.get('/logs', { params });
+// Per-minute log counts by module and level
+export const getLogRollups = (params) => api.get('/logs/rollups', { params });
+// Latency percentiles per stage (jobs, retrieval, LLM providers, DB commits, HTTP routes)
+export const getMetricsSummary = () => api.get('/metrics/summary');
+// Ranked full-text search over leads and conversations; snippets wrap matched terms in <mark>
+export const search = (q, params) => api.get('/search', { params: { q, ...params } });
+// Delta sync: list responses carry an X-Sync-Cursor header; /changes returns only rows written after it
+export const getChanges = (resource, since) => api.get(`/changes/${resource}`, { params: { since } });
+
+export const pollChanges = async (resource, since) => {
+    let items = [];
+    let cursor = since;
+    let hasMore = true;
+    while (hasMore) {
+        const res = await getChanges(resource, cursor);
+        items = items.concat(res.data.items);
+        cursor = res.data.cursor;
+        hasMore = res.data.has_more;
+    }
+    return { items, cursor };
+};
+
+// Replaces changed rows by id, adds new ones and keeps the newest `limit` by sortKey
+export const mergeChanges = (current, changed, sortKey, limit = 100) => {
+    if (changed.length === 0) return current;
+    const byId = new Map(current.map(row => [row.id, row]));
+    changed.forEach(row => byId.set(row.id, row));
+    return Array.from(byId.values())
+        .sort((a, b) => new Date(b[sortKey]) - new Date(a[sortKey]) || b.id - a.id)
+        .slice(0, limit);
+};
+
+// Server-Sent Events push stream, one EventSource per page shared by every subscriber.
+// It reconnects and resumes from the last event id by itself; it is closed with the last subscriber.
+let eventSource = null;
+const eventTypes = new Set();
+const eventListeners = new Set();
+
+const listenFor = (type) => {
+    if (eventTypes.has(type)) return;
+    eventTypes.add(type);
+    eventSource.addEventListener(type, (e) => {
+        const data = e.data ? JSON.parse(e.data) : {};
+        eventListeners.forEach(listener => listener(type, data));
+    });
+};
+
+// onEvents gets the events of a burst together, at most once per `delay` ms, so a flush
+// of many rows costs one delta fetch instead of one per row
+export const subscribeEvents = (types, onEvents, delay = 250) => {
+    if (!eventSource) {
+        eventSource = new EventSource(`${API_URL}/events`);
+        eventTypes.clear();
+        // The server lost our position (e.g. it restarted): treat it like any other change
+        listenFor('reset');
+    }
+    types.forEach(listenFor);
+
+    let pending = [];
+    let timer = null;
+    const listener = (type, data) => {
+        if (type !== 'reset' && !types.includes(type)) return;
+        pending.push({ type, data });
+        if (timer) return;
+        timer = setTimeout(() => {
+            const events = pending;
+            pending = [];
+            timer = null;
+            onEvents(events);
+        }, delay);
+    };
+    eventListeners.add(listener);
+
+    return () => {
+        clearTimeout(timer);
+        eventListeners.delete(listener);
+        if (eventListeners.size === 0 && eventSource) {
+            eventSource.close();
+            eventSource = null;
+        }
+    };
+};
+
 export const getSettings = (key) => api.get(`/settings/${key}`);
 export const updateSettings = (key, value) => api.post(`/settings/${key}`, value);
 
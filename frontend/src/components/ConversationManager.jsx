@@ -1,15 +1,23 @@
-import React, { useEffect, useState } from 'react';
-import { getConversations, toggleTakeover } from '../api';
+import React, { useEffect, useRef, useState } from 'react';
+import { getConversations, getConversation, toggleTakeover, pollChanges, mergeChanges, subscribeEvents } from '../api';
 import { MessageSquare, User, Power, Bot } from 'lucide-react';
 
 const ConversationManager = () => {
     const [conversations, setConversations] = useState([]);
     const [selectedId, setSelectedId] = useState(null);
+    const cursorRef = useRef(null);
 
     const fetchConvs = async () => {
         try {
-            const res = await getConversations();
-            setConversations(res.data);
+            if (!cursorRef.current) {
+                const res = await getConversations();
+                cursorRef.current = res.headers['x-sync-cursor'];
+                setConversations(res.data);
+            } else {
+                const { items, cursor } = await pollChanges('conversations', cursorRef.current);
+                cursorRef.current = cursor;
+                setConversations(prev => mergeChanges(prev, items, 'last_message_at'));
+            }
         } catch (e) {
             console.error("Failed to fetch conversations", e);
         }
@@ -17,11 +25,28 @@ const ConversationManager = () => {
 
     useEffect(() => {
         fetchConvs();
-        const interval = setInterval(fetchConvs, 5000);
-        return () => clearInterval(interval);
+        // Each burst of pushed events triggers one delta fetch; polling is only a slow fallback
+        const unsubscribe = subscribeEvents(['conversation', 'message', 'takeover'], () => fetchConvs());
+        const interval = setInterval(fetchConvs, 60000);
+        return () => {
+            unsubscribe();
+            clearInterval(interval);
+        };
     }, []);
 
     const selectedConv = conversations.find(c => c.id === selectedId);
+    const [messages, setMessages] = useState([]);
+
+    // The list only carries summaries; load the history of the selected chat when it changes
+    useEffect(() => {
+        if (!selectedConv) {
+            setMessages([]);
+            return;
+        }
+        getConversation(selectedConv.reddit_username)
+            .then(res => setMessages(res.data.messages))
+            .catch(e => console.error("Failed to fetch conversation", e));
+    }, [selectedConv?.reddit_username, selectedConv?.version]);
 
     const handleTakeover = async (enable) => {
         if (!selectedConv) return;
@@ -52,6 +77,9 @@ const ConversationManager = () => {
                                 <span className="font-semibold text-gray-200 truncate pr-2">u/{c.reddit_username}</span>
                                 {c.human_takeover && <Power className="w-3 h-3 text-red-400 shrink-0" />}
                             </div>
+                            {c.last_message_preview && (
+                                <div className="text-xs text-gray-400 truncate mt-1">{c.last_message_preview}</div>
+                            )}
                             <div className="flex justify-between items-center mt-1">
                                 <span className="text-xs text-gray-500 capitalize">{c.status}</span>
                                 <span className="text-xs text-gray-600">{new Date(c.last_message_at).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' })}</span>
@@ -81,8 +109,8 @@ const ConversationManager = () => {
                             </button>
                         </div>
                         <div className="flex-1 overflow-y-auto p-4 space-y-4 custom-scrollbar">
-                            {selectedConv.messages && selectedConv.messages.length > 0 ? (
-                                selectedConv.messages.map((m, idx) => (
+                            {messages.length > 0 ? (
+                                messages.map((m, idx) => (
                                     <div key={idx} className={`flex ${m.role === 'assistant' ? 'justify-end' : 'justify-start'}`}>
                                         <div className={`max-w-[75%] p-3.5 rounded-2xl text-sm shadow-md ${m.role === 'assistant' ? 'bg-indigo-600 text-white rounded-br-none' : 'bg-gray-700 text-gray-100 rounded-bl-none'}`}>
                                             <div className="flex items-center mb-1 opacity-70 text-[10px] uppercase font-bold tracking-wider">
@@ -1,24 +1,68 @@
-import React, { useEffect, useState } from 'react';
-import { getLeads } from '../api';
-import { ExternalLink, TrendingUp, User, Activity } from 'lucide-react';
+import React, { useEffect, useRef, useState } from 'react';
+import { getLeads, pollChanges, mergeChanges, subscribeEvents, search } from '../api';
+import { ExternalLink, TrendingUp, User, Activity, Search, Copy } from 'lucide-react';
+
+// Renders a search snippet with its <mark>-wrapped terms highlighted, without injecting HTML
+const Highlighted = ({ text }) => (
+    <>
+        {text.split(/<mark>(.*?)<\/mark>/).map((part, i) => (
+            i % 2 ? <mark key={i} className="bg-sky-500/20 text-sky-300 rounded px-0.5">{part}</mark> : part
+        ))}
+    </>
+);
 
 const LeadViewer = () => {
     const [leads, setLeads] = useState([]);
+    const [query, setQuery] = useState('');
+    const [results, setResults] = useState(null);
+    const cursorRef = useRef(null);
 
     useEffect(() => {
         const fetchLeads = async () => {
             try {
-                const response = await getLeads();
-                setLeads(response.data);
+                if (!cursorRef.current) {
+                    const response = await getLeads();
+                    cursorRef.current = response.headers['x-sync-cursor'];
+                    setLeads(response.data);
+                } else {
+                    const { items, cursor } = await pollChanges('leads', cursorRef.current);
+                    cursorRef.current = cursor;
+                    // Near-duplicates are folded into their canonical lead's cross-post count
+                    setLeads(prev => mergeChanges(prev, items.filter(item => !item.duplicate_of), 'created_at'));
+                }
             } catch (error) {
                 console.error("Failed to fetch leads", error);
             }
         };
         fetchLeads();
-        const interval = setInterval(fetchLeads, 30000);
-        return () => clearInterval(interval);
+        // Each burst of pushed events triggers one delta fetch; polling is only a slow fallback
+        const unsubscribe = subscribeEvents(['lead', 'lead_updated'], () => fetchLeads());
+        const interval = setInterval(fetchLeads, 60000);
+        return () => {
+            unsubscribe();
+            clearInterval(interval);
+        };
     }, []);
 
+    useEffect(() => {
+        if (!query.trim()) {
+            setResults(null);
+            return;
+        }
+        // Debounced so typing doesn't send a request per keystroke
+        const timeout = setTimeout(async () => {
+            try {
+                const response = await search(query, { type: 'leads', limit: 50 });
+                setResults(response.data.leads);
+            } catch (error) {
+                console.error("Search failed", error);
+            }
+        }, 250);
+        return () => clearTimeout(timeout);
+    }, [query]);
+
+    const shown = results ?? leads;
+
     return (
         <div className="glass-card rounded-[2.5rem] p-10 shadow-2xl overflow-hidden relative border-slate-700/40">
             <div className="absolute top-0 right-0 w-64 h-64 bg-sky-500/5 blur-[100px] rounded-full -mr-20 -mt-20"></div>
@@ -34,13 +78,27 @@ const LeadViewer = () => {
                     </div>
                 </div>
                 <div className="flex space-x-2">
+                    <div className="relative">
+                        <Search className="w-4 h-4 text-slate-500 absolute left-3 top-1/2 -translate-y-1/2" />
+                        <input
+                            type="text"
+                            value={query}
+                            onChange={(e) => setQuery(e.target.value)}
+                            placeholder="Search leads..."
+                            className="pl-9 pr-4 py-2 bg-slate-800/80 text-slate-200 text-xs font-semibold rounded-xl border border-slate-700/50 focus:outline-none focus:border-sky-500/40 w-56"
+                        />
+                    </div>
                     <button className="px-4 py-2 bg-slate-800/80 hover:bg-slate-700 text-slate-300 text-xs font-bold rounded-xl transition-all border border-slate-700/50">Export CSV</button>
                     <button className="px-4 py-2 bg-sky-500/10 hover:bg-sky-500/20 text-sky-400 text-xs font-bold rounded-xl transition-all border border-sky-500/20">Filter</button>
                 </div>
             </div>
 
             <div className="space-y-6 max-h-[700px] overflow-y-auto pr-2 custom-scrollbar relative z-10">
-                {leads.length === 0 ? (
+                {results && results.length === 0 ? (
+                    <div className="flex flex-col items-center justify-center py-24 text-slate-500">
+                        <p className="text-lg font-medium">No leads match "{query}"</p>
+                    </div>
+                ) : shown.length === 0 ? (
                     <div className="flex flex-col items-center justify-center py-24 text-slate-500">
                         <div className="w-16 h-16 bg-slate-800/40 rounded-full flex items-center justify-center mb-4 border border-slate-700/30">
                             <Activity className="w-8 h-8 opacity-20" />
@@ -49,7 +107,7 @@ const LeadViewer = () => {
                         <p className="text-xs uppercase tracking-widest mt-2 font-bold opacity-50">Discovery engine online</p>
                     </div>
                 ) : (
-                    leads.map(lead => (
+                    shown.map(lead => (
                         <div key={lead.id} className="bg-slate-800/40 p-6 rounded-3xl hover:bg-slate-800/60 transition-all duration-300 border border-slate-700/30 hover:border-sky-500/30 group">
                             <div className="flex justify-between items-start mb-4">
                                 <div className="flex-1 mr-6">
@@ -61,6 +119,12 @@ const LeadViewer = () => {
                                             <User className="w-3 h-3 mr-1.5 opacity-50" />
                                             u/{lead.author}
                                         </span>
+                                        {lead.duplicate_count > 0 && (
+                                            <span className="text-[10px] font-bold px-3 py-1 rounded-full bg-amber-500/10 text-amber-400 border border-amber-500/20 uppercase tracking-widest leading-none flex items-center">
+                                                <Copy className="w-3 h-3 mr-1.5 opacity-50" />
+                                                +{lead.duplicate_count} cross-post{lead.duplicate_count > 1 ? 's' : ''}
+                                            </span>
+                                        )}
                                     </div>
                                     <h3 className="text-xl font-bold text-white group-hover:text-sky-300 transition duration-300 tracking-tight">{lead.title}</h3>
                                 </div>
@@ -77,7 +141,7 @@ const LeadViewer = () => {
                                 </div>
                             </div>
                             <p className="text-slate-400 text-sm leading-relaxed line-clamp-2 font-medium opacity-80 group-hover:opacity-100 transition-opacity">
-                                {lead.body}
+                                {lead.snippet ? <Highlighted text={lead.snippet} /> : lead.body}
                             </p>
                             <div className="mt-6 pt-5 border-t border-slate-700/20 flex justify-between items-center">
                                 <span className="text-[11px] font-bold text-slate-500 uppercase tracking-widest">
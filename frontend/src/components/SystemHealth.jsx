@@ -1,9 +1,11 @@
-import React, { useEffect, useState } from 'react';
-import { getLogs } from '../api';
-import { Activity, Server, AlertCircle, CheckCircle, Database } from 'lucide-react';
+import React, { useEffect, useRef, useState } from 'react';
+import { getLogs, getLogRollups, getMetricsSummary, pollChanges, mergeChanges, subscribeEvents } from '../api';
+import { Activity, Server, AlertCircle, CheckCircle, Database, Gauge } from 'lucide-react';
 
 const SystemHealth = () => {
     const [logs, setLogs] = useState([]);
+    const [rollups, setRollups] = useState([]);
+    const [stages, setStages] = useState([]);
 
     // Mock status for now
     const status = {
@@ -12,17 +14,68 @@ const SystemHealth = () => {
         database: true
     };
 
+    const cursorRef = useRef(null);
+
     const fetchLogs = async () => {
         try {
-            const res = await getLogs();
-            setLogs(res.data);
+            if (!cursorRef.current) {
+                const res = await getLogs();
+                cursorRef.current = res.headers['x-sync-cursor'];
+                setLogs(res.data);
+            } else {
+                const { items, cursor } = await pollChanges('logs', cursorRef.current);
+                cursorRef.current = cursor;
+                setLogs(prev => mergeChanges(prev, items, 'timestamp', 50));
+            }
+        } catch (e) { console.error(e); }
+    };
+
+    const fetchRollups = async () => {
+        try {
+            const res = await getLogRollups({ minutes: 60 });
+            setRollups(res.data);
+        } catch (e) { console.error(e); }
+    };
+
+    const fetchMetrics = async () => {
+        try {
+            const res = await getMetricsSummary();
+            // One row per histogram series, e.g. "llm_request_seconds provider=groq outcome=ok"
+            const rows = [];
+            Object.entries(res.data.histograms).forEach(([name, { series }]) => {
+                series.forEach(s => rows.push({
+                    name: [name.replace(/_seconds$/, ''), ...Object.values(s.labels)].join(' · '),
+                    ...s,
+                }));
+            });
+            setStages(rows.sort((a, b) => (b.p95_ms || 0) - (a.p95_ms || 0)).slice(0, 12));
         } catch (e) { console.error(e); }
     };
 
+    // Last hour's record counts per level and per module
+    const levelCounts = {};
+    const moduleCounts = {};
+    rollups.forEach(r => {
+        levelCounts[r.level] = (levelCounts[r.level] || 0) + r.count;
+        if (r.level !== 'INFO') moduleCounts[r.module] = (moduleCounts[r.module] || 0) + r.count;
+    });
+    const noisiest = Object.entries(moduleCounts).sort((a, b) => b[1] - a[1]).slice(0, 3);
+
     useEffect(() => {
         fetchLogs();
-        const interval = setInterval(fetchLogs, 10000);
-        return () => clearInterval(interval);
+        fetchRollups();
+        fetchMetrics();
+        const rollupInterval = setInterval(fetchRollups, 60000);
+        const metricsInterval = setInterval(fetchMetrics, 30000);
+        // Each burst of pushed events triggers one delta fetch; polling is only a slow fallback
+        const unsubscribe = subscribeEvents(['log'], () => fetchLogs());
+        const interval = setInterval(fetchLogs, 60000);
+        return () => {
+            unsubscribe();
+            clearInterval(interval);
+            clearInterval(rollupInterval);
+            clearInterval(metricsInterval);
+        };
     }, []);
 
     return (
@@ -33,6 +86,56 @@ const SystemHealth = () => {
                 <StatusCard title="Database" active={status.database} icon={Database} />
             </div>
 
+            <div className="grid grid-cols-1 md:grid-cols-4 gap-4">
+                {['INFO', 'WARNING', 'ERROR'].map(level => (
+                    <div key={level} className="bg-gray-800 p-4 rounded-xl border border-gray-700 shadow-md">
+                        <div className="text-[10px] font-bold tracking-wider text-gray-500">{level} / LAST HOUR</div>
+                        <div className={`text-2xl font-bold ${level === 'ERROR' ? 'text-red-500' : level === 'WARNING' ? 'text-yellow-500' : 'text-blue-400'}`}>{levelCounts[level] || 0}</div>
+                    </div>
+                ))}
+                <div className="bg-gray-800 p-4 rounded-xl border border-gray-700 shadow-md">
+                    <div className="text-[10px] font-bold tracking-wider text-gray-500">WARNINGS + ERRORS BY MODULE</div>
+                    {noisiest.length === 0 ? (
+                        <div className="text-gray-600 italic text-sm">None</div>
+                    ) : noisiest.map(([module, count]) => (
+                        <div key={module} className="flex justify-between text-xs text-gray-300"><span>{module}</span><span>{count}</span></div>
+                    ))}
+                </div>
+            </div>
+
+            <div className="bg-gray-800 rounded-xl p-6 shadow-lg border border-gray-700">
+                <h3 className="text-lg font-bold text-white mb-4 flex items-center">
+                    <Gauge className="w-4 h-4 mr-2 text-blue-400" />
+                    Slowest Stages
+                </h3>
+                {stages.length === 0 ? (
+                    <div className="text-gray-600 italic text-sm">No timings recorded yet.</div>
+                ) : (
+                    <table className="w-full text-xs text-gray-300 font-mono">
+                        <thead>
+                            <tr className="text-gray-500 text-[10px] tracking-wider">
+                                <th className="text-left font-bold pb-2">STAGE</th>
+                                <th className="text-right font-bold pb-2">COUNT</th>
+                                <th className="text-right font-bold pb-2">P50 MS</th>
+                                <th className="text-right font-bold pb-2">P95 MS</th>
+                                <th className="text-right font-bold pb-2">P99 MS</th>
+                            </tr>
+                        </thead>
+                        <tbody>
+                            {stages.map(stage => (
+                                <tr key={stage.name} className="border-t border-white/5">
+                                    <td className="py-1 break-all">{stage.name}</td>
+                                    <td className="py-1 text-right">{stage.count}</td>
+                                    <td className="py-1 text-right">{stage.p50_ms}</td>
+                                    <td className="py-1 text-right text-yellow-500">{stage.p95_ms}</td>
+                                    <td className="py-1 text-right">{stage.p99_ms}</td>
+                                </tr>
+                            ))}
+                        </tbody>
+                    </table>
+                )}
+            </div>
+
             <div className="bg-gray-800 rounded-xl p-6 shadow-lg border border-gray-700">
                 <h3 className="text-lg font-bold text-white mb-4 flex items-center">
                     <AlertCircle className="w-4 h-4 mr-2 text-yellow-500" />